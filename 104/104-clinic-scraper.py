@@ -3,17 +3,33 @@
 104 新成立診所爬蟲
 搜尋台北市+新北市新成立/籌備中的診所，排除指定科別
 
+抓取方式：六個搜尋策略的第 1 頁同時送出，拿到 lastPage 後該策略其餘頁面再同時展開；
+每頁一到就以 jobNo 去重（同一 jobNo 保留策略順序 / 頁碼 / 頁內位置最前面的一筆，結果與逐頁抓取相同）。
+
+職缺索引 job_index.json：每次執行都記下看過的 jobNo / custName 與 first_seen / last_seen。
+--since-last-run 時各策略改為逐頁抓（API 以 order=15 依刊登日新到舊排序），
+一頁全是索引裡已有的 jobNo 就停止翻頁，只列出新出現的公司；
+消失的公司要所有策略都翻到最後一頁才判斷得出來，沒翻完時只提示、不更新。
+
 用法:
   python3 104-clinic-scraper.py                  # 預設搜尋
   python3 104-clinic-scraper.py --out results.json  # 輸出 JSON
+  python3 104-clinic-scraper.py --since-last-run    # 只看上次之後新出現 / 消失的公司
+  python3 104-clinic-scraper.py --record /tmp/rec/104  # 錄下 API 回應
+  python3 104-clinic-scraper.py --replay /tmp/rec/104  # 不連網，重播錄好的回應
 """
 
 import json
-import urllib.request
-import urllib.parse
 import argparse
+import asyncio
+import sys
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scraper"))
+import fetch  # noqa: E402  共用 HTTP 抓取層（scraper/fetch.py）
+from store import atomic_write  # noqa: E402
 
 # ── 設定 ──────────────────────────────────────────────────
 
@@ -40,6 +56,15 @@ NAME_EXCLUDE_KEYWORDS = [
     "美學", "美容", "婦產", "產後", "月子",
 ]
 
+# 每個策略最多翻幾頁
+MAX_PAGES = 49
+
+# 看過的職缺 / 公司（本機狀態，不進版控）
+INDEX_PATH = Path(__file__).resolve().parent / "job_index.json"
+
+# 完整跑完時，超過這麼久沒再出現的職缺從索引移除（已下架），避免 jobs 無限增長
+JOB_RETENTION = timedelta(days=30)
+
 # 多策略搜尋關鍵字
 SEARCH_STRATEGIES = [
     # (keyword, extra_params, 說明)
@@ -54,28 +79,80 @@ SEARCH_STRATEGIES = [
 
 # ── 核心函式 ──────────────────────────────────────────────
 
-def fetch_page(params: dict) -> dict:
-    """打 104 API 拿一頁結果"""
-    qs = urllib.parse.urlencode(params)
-    url = f"{API_URL}?{qs}"
-    req = urllib.request.Request(url, headers=HEADERS)
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read())
-
-
-def fetch_all_pages(params_base: dict) -> list:
-    """自動翻頁，回傳所有 job list"""
-    all_jobs = []
-    for page in range(1, 50):
-        params_base["page"] = str(page)
-        d = fetch_page(params_base)
-        pagination = d.get("metadata", {}).get("pagination", {})
-        data = d.get("data", {})
-        lst = data.get("list", []) if isinstance(data, dict) else data
-        all_jobs.extend(lst)
-        if page >= pagination.get("lastPage", 1):
-            break
-    return all_jobs
+async def fetch_page(params: dict, page: int = 1) -> dict:
+    """打 104 API 拿一頁結果（不修改 params）"""
+    resp = await fetch.client().get(API_URL, params={**params, "page": str(page)}, headers=HEADERS)
+    return resp.json()
+
+
+def page_jobs(d: dict) -> list:
+    data = d.get("data", {})
+    return data.get("list", []) if isinstance(data, dict) else data
+
+
+def last_page(d: dict) -> int:
+    return min(d.get("metadata", {}).get("pagination", {}).get("lastPage", 1) or 1, MAX_PAGES)
+
+
+class JobCollector:
+    """
+    邊收頁面邊以 jobNo 去重。同一 jobNo 保留 (策略序, 頁碼, 頁內位置) 最小的一筆，
+    所以不論頁面到達順序，jobs() 都與依序逐頁抓取的結果相同。
+    """
+
+    def __init__(self):
+        self._best = {}          # jobNo → ((策略序, 頁碼, 位置), job)
+        self.raw_counts = defaultdict(int)   # 策略序 → 抓到的筆數（含重複）
+
+    def add(self, strategy: int, page: int, jobs: list) -> None:
+        self.raw_counts[strategy] += len(jobs)
+        for pos, job in enumerate(jobs):
+            jno = job.get("jobNo", "")
+            if not jno:
+                continue
+            key = (strategy, page, pos)
+            current = self._best.get(jno)
+            if current is None or key < current[0]:
+                self._best[jno] = (key, job)
+
+    def jobs(self) -> list:
+        return [job for _, job in sorted(self._best.values(), key=lambda x: x[0])]
+
+    def new_counts(self) -> dict:
+        """策略序 → 該策略貢獻的不重複筆數（與逐一執行策略時的「新增」相同）"""
+        counts = defaultdict(int)
+        for (strategy, _, _), _ in self._best.values():
+            counts[strategy] += 1
+        return counts
+
+
+async def fetch_all_pages(params_base: dict, strategy: int, collector: JobCollector) -> None:
+    """先抓第 1 頁取得 lastPage，其餘頁面同時抓；每頁到了就交給 collector"""
+    first = await fetch_page(params_base, 1)
+    collector.add(strategy, 1, page_jobs(first))
+
+    async def one(page):
+        collector.add(strategy, page, page_jobs(await fetch_page(params_base, page)))
+
+    await asyncio.gather(*(one(page) for page in range(2, last_page(first) + 1)))
+
+
+async def fetch_new_pages(params_base: dict, strategy: int, collector: JobCollector,
+                          known: set) -> bool:
+    """
+    逐頁抓到某一頁全是 known 裡的 jobNo 為止（order=15 新的在前）。
+    回傳是否翻到了最後一頁（True 表示這個策略的結果是完整的）。
+    """
+    page, last = 1, 1
+    while page <= last:
+        d = await fetch_page(params_base, page)
+        jobs = page_jobs(d)
+        collector.add(strategy, page, jobs)
+        last = last_page(d)
+        if jobs and all(j.get("jobNo") in known for j in jobs):
+            return page >= last
+        page += 1
+    return True
 
 
 def is_name_excluded(name: str) -> bool:
@@ -94,30 +171,38 @@ def is_relevant(job: dict) -> bool:
     return any(kw in combined for kw in relevance_keywords)
 
 
-def run_scraper(areas: dict) -> list:
-    """執行多策略搜尋，合併去重 + post-filter"""
+def strategy_params(area_codes: str, keyword: str, extra_params: dict) -> dict:
+    return {
+        "keyword": keyword,
+        "area": area_codes,
+        "order": "15",
+        "mode": "s",
+        "excludeJobKeyword": API_EXCLUDE,
+        **extra_params,
+    }
+
+
+async def run_scraper(areas: dict, known: set = None) -> tuple:
+    """
+    執行多策略搜尋（各策略同時進行），合併去重 + post-filter。
+    known 有值時各策略翻到全是已知職缺的頁面就停（--since-last-run）。
+    回傳 (相關職缺, 去重後全部職缺, 是否每個策略都翻到最後一頁)
+    """
     area_codes = ",".join(areas.values())
-    seen_job_nos = set()
-    all_jobs = []
-
-    for keyword, extra_params, label in SEARCH_STRATEGIES:
-        params = {
-            "keyword": keyword,
-            "area": area_codes,
-            "order": "15",
-            "mode": "s",
-            "excludeJobKeyword": API_EXCLUDE,
-            **extra_params,
-        }
-        jobs = fetch_all_pages(params)
-        new_count = 0
-        for j in jobs:
-            jno = j.get("jobNo", "")
-            if jno and jno not in seen_job_nos:
-                seen_job_nos.add(jno)
-                all_jobs.append(j)
-                new_count += 1
-        print(f"  [{label}] {len(jobs)} 筆，新增 {new_count} 筆")
+    collector = JobCollector()
+    params = [strategy_params(area_codes, keyword, extra) for keyword, extra, _ in SEARCH_STRATEGIES]
+    if known is None:
+        await asyncio.gather(*(fetch_all_pages(p, i, collector) for i, p in enumerate(params)))
+        complete = True
+    else:
+        done = await asyncio.gather(*(fetch_new_pages(p, i, collector, known)
+                                      for i, p in enumerate(params)))
+        complete = all(done)
+
+    all_jobs = collector.jobs()
+    new_counts = collector.new_counts()
+    for i, (_, _, label) in enumerate(SEARCH_STRATEGIES):
+        print(f"  [{label}] {collector.raw_counts[i]} 筆，新增 {new_counts[i]} 筆")
 
     print(f"\n合併去重: {len(all_jobs)} 筆")
 
@@ -132,7 +217,75 @@ def run_scraper(areas: dict) -> list:
     print(f"排除無關職缺: -{noise_count} 筆")
     print(f"最終結果: {len(relevant)} 筆")
 
-    return relevant
+    return relevant, all_jobs, complete
+
+
+# ── 職缺索引 ──────────────────────────────────────────────
+
+def load_index(path: Path = INDEX_PATH) -> dict:
+    """
+    {"last_run", "jobs": {jobNo: {"custName", "first_seen", "last_seen"}},
+     "companies": {custName: {"first_seen", "last_seen", "active"}}}
+    jobs 收全部抓到的職缺（判斷翻頁停點用），companies 只收通過 post-filter 的公司。
+    """
+    if not path.exists():
+        return {"last_run": None, "jobs": {}, "companies": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def update_index(index: dict, all_jobs: list, relevant: list, complete: bool,
+                 now: str) -> tuple:
+    """
+    把本次結果併進 index，回傳 (新出現的公司, 消失的公司)。
+    新出現：不在索引或上次已判定消失；消失：complete 時，索引中仍 active 但這次沒抓到。
+    complete 時也移除 last_seen 早於 JOB_RETENTION 的職缺。
+    """
+    for j in all_jobs:
+        entry = index["jobs"].setdefault(j["jobNo"], {"custName": j.get("custName", ""),
+                                                      "first_seen": now})
+        entry["last_seen"] = now
+
+    seen = {j.get("custName", "") for j in relevant}
+    new = []
+    for name in sorted(seen):
+        entry = index["companies"].get(name)
+        if entry is None or not entry.get("active"):
+            new.append(name)
+            entry = index["companies"].setdefault(name, {"first_seen": now})
+        entry["last_seen"] = now
+        entry["active"] = True
+
+    gone = []
+    if complete:
+        for name, entry in sorted(index["companies"].items()):
+            if entry.get("active") and name not in seen:
+                entry["active"] = False
+                gone.append(name)
+        cutoff = (datetime.fromisoformat(now) - JOB_RETENTION).isoformat(timespec="seconds")
+        index["jobs"] = {no: entry for no, entry in index["jobs"].items()
+                         if entry["last_seen"] >= cutoff}
+
+    index["last_run"] = now
+    return new, gone
+
+
+def save_index(index: dict, path: Path = INDEX_PATH) -> None:
+    atomic_write(path, json.dumps(index, ensure_ascii=False, indent=2) + "\n")
+
+
+def print_changes(new: list, gone: list, complete: bool, index: dict):
+    """--since-last-run：只印新出現 / 消失的公司"""
+    print(f"\n{'=' * 90}")
+    print(f"新出現 {len(new)} 家")
+    for name in new:
+        print(f"  🆕 {name}")
+    if complete:
+        print(f"消失 {len(gone)} 家")
+        for name in gone:
+            print(f"  👋 {name}（最後看到 {index['companies'][name]['last_seen']}）")
+    else:
+        print("消失：未翻完全部頁面無法判斷（不加 --since-last-run 完整跑一次才會更新）")
 
 
 def group_by_company(jobs: list) -> dict:
@@ -206,16 +359,39 @@ def export_json(groups: dict, path: str):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="104 新成立診所爬蟲")
     parser.add_argument("--out", type=str, help="匯出 JSON 檔路徑")
+    parser.add_argument("--since-last-run", action="store_true",
+                        help="翻到全是已知職缺的頁面就停，只列出新出現 / 消失的公司")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH,
+                        help=f"職缺索引檔（預設 {INDEX_PATH.name}）")
+    fetch.add_capture_arguments(parser)
     args = parser.parse_args()
+    client = fetch.configure(args)
 
-    print(f"🔍 104 新成立診所爬蟲 — {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    now = datetime.now()
+    print(f"🔍 104 新成立診所爬蟲 — {now.strftime('%Y-%m-%d %H:%M')}")
     print(f"   區域: {', '.join(AREAS.keys())}")
     print(f"   排除: {', '.join(NAME_EXCLUDE_KEYWORDS)}")
+    index = load_index(args.index)
+    if args.since_last_run:
+        print(f"   上次執行: {index['last_run'] or '（無索引，全部翻完）'}")
     print()
 
-    jobs = run_scraper(AREAS)
+    known = set(index["jobs"]) if args.since_last_run else None
+    jobs, all_jobs, complete = fetch.run(run_scraper(AREAS, known))
+    print(fetch.client().stats_line())
+
+    new, gone = update_index(index, all_jobs, jobs, complete, now.isoformat(timespec="seconds"))
+    if client.replay_dir:
+        print("（重播模式，不更新職缺索引）")
+    else:
+        save_index(index, args.index)
+
     groups = group_by_company(jobs)
-    print_results(groups)
+    if args.since_last_run:
+        print_changes(new, gone, complete, index)
+    else:
+        print_results(groups)
+        print(f"\n與上次相比：新出現 {len(new)} 家，消失 {len(gone)} 家")
 
     if args.out:
         export_json(groups, args.out)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+schedules.json → 依 ISO 週切片的前端資料（data/）
+
+index.html 只需顯示 2 天或 1 週，不必每次下拉更新都抓整份 schedules.json。
+本腳本輸出：
+  data/manifest.json          診所表、各診所醫師清單、週切片清單（含內容 hash）
+  data/weeks/{YYYY}-W{WW}.json 該 ISO 週（週一 ~ 週日）的 sessions
+
+前端流程：manifest 一律 no-store 取最新；週切片 URL 帶 ?h={hash}，內容不變就吃瀏覽器快取。
+內容沒變的切片不重寫檔案，git diff 只會出現真的有異動的週。
+
+Transaction.commit 寫回 schedules.json 後會自動重建；手動改過 schedules.json 時請自行執行：
+  python3 scraper/build_shards.py
+
+  # 只檢查 data/ 是否與 schedules.json 同步（不寫檔，不同步時 exit 1）
+  python3 scraper/build_shards.py --check
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+from store import SCHEDULES_JSON, ScheduleStore, atomic_write
+
+DATA_DIR = SCHEDULES_JSON.parent / "data"
+WEEKS_SUBDIR = "weeks"
+
+
+def iso_week(date_str: str) -> tuple:
+    """'2026-06-29' → ('2026-W27', '2026-06-29', '2026-07-05')（週名, 週一, 週日）。"""
+    d = date.fromisoformat(date_str)
+    year, week, _ = d.isocalendar()
+    monday = d - timedelta(days=d.weekday())
+    return f"{year}-W{week:02d}", monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def build(store: ScheduleStore, out_dir: Path = None, write: bool = True) -> dict:
+    """
+    產生 manifest 與週切片（預設寫到 schedules.json 同層的 data/）。write=False 時只計算不寫檔。
+    回傳 {"manifest": dict, "changed": [有異動（或 write=False 時會異動）的檔案相對路徑]}。
+    """
+    out_dir = Path(out_dir) if out_dir else store.path.parent / DATA_DIR.name
+    weeks = {}       # week → {"start", "end", "sessions"}
+    doctors = {}     # clinic_id → {doctor_name: None}（保持首次出現順序）
+    week_of = {}     # date → (week, start, end)
+    for s in store.sessions():
+        d = s["date"]
+        if d not in week_of:
+            week_of[d] = iso_week(d)
+        week, start, end = week_of[d]
+        weeks.setdefault(week, {"start": start, "end": end, "sessions": []})["sessions"].append(s)
+        doctors.setdefault(s["clinic_id"], {}).setdefault(s["doctor_name"])
+
+    changed = []
+    shards = []
+    for week in sorted(weeks):
+        info = weeks[week]
+        body = _dumps({"week": week, "start": info["start"], "end": info["end"],
+                       "sessions": info["sessions"]})
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+        rel = f"{WEEKS_SUBDIR}/{week}.json"
+        shards.append({"week": week, "start": info["start"], "end": info["end"],
+                       "file": rel, "hash": digest, "sessions": len(info["sessions"])})
+        if _write_if_changed(out_dir / rel, body, write):
+            changed.append(rel)
+
+    manifest = {
+        "meta": store.meta,
+        "clinics": store.clinics,
+        "doctors": {cid: list(names) for cid, names in doctors.items()},
+        "shards": shards,
+    }
+    if _write_if_changed(out_dir / "manifest.json", _dumps(manifest), write):
+        changed.append("manifest.json")
+
+    live = {sh["file"] for sh in shards}
+    weeks_dir = out_dir / WEEKS_SUBDIR
+    for stale in sorted(weeks_dir.glob("*.json")) if weeks_dir.exists() else []:
+        rel = f"{WEEKS_SUBDIR}/{stale.name}"
+        if rel not in live:
+            changed.append(rel)
+            if write:
+                stale.unlink()
+    return {"manifest": manifest, "changed": changed}
+
+
+def _write_if_changed(path: Path, body: str, write: bool) -> bool:
+    if path.exists() and path.read_text(encoding="utf-8") == body:
+        return False
+    if write:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, body)
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="schedules.json → data/ 週切片")
+    ap.add_argument("--check", action="store_true", help="只檢查 data/ 是否與 schedules.json 同步")
+    args = ap.parse_args()
+
+    store = ScheduleStore.load()
+    result = build(store, write=not args.check)
+    shards = result["manifest"]["shards"]
+    changed = result["changed"]
+    if args.check:
+        if changed:
+            print(f"⚠️  data/ 與 schedules.json 不同步（{len(changed)} 個檔案）：")
+            for rel in changed:
+                print(f"  {rel}")
+            raise SystemExit(1)
+        print(f"✅ data/ 已同步（{len(shards)} 週）")
+        return
+    print(f"✅ 已輸出 {len(shards)} 週切片 → {DATA_DIR}（異動 {len(changed)} 個檔案）")
+    for rel in changed:
+        print(f"  {rel}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+schedules.json 的精簡編碼（schedules.compact.json，放在正本旁邊）
+
+正本每筆 session 都重複完整的醫師名、clinic_id、time_label 與很長的 source_note，
+再加上 indent=2，1.8 MB 裡大半是重複字串。精簡格式：
+  - 字串表：doctors / labels（time_label）/ notes（source_note）/ id_patterns
+  - clinic：clinics 陣列的索引
+  - date：與 base 日期相差的天數
+  - slot：SLOTS 列舉的索引
+  - id：多數 id 內含日期 MMDD（例 fc_m1_0629），換成 "~" 後收進 id_patterns 共用；
+        不含 MMDD 的 id 原字串保留
+每筆 session 為一個陣列：[id, clinic, doctor, day, slot, label, note]，缺欄位以 null 表示。
+
+正本仍是唯一資料來源；本檔是衍生檔，每次 Transaction.commit 寫回後自動重建，
+寫檔前一律做 encode → decode 來回比對，不相等就不寫。
+
+用法：
+  # 重建 schedules.compact.json（含來回比對）
+  python3 scraper/compact.py
+
+  # 只做來回比對 + 大小統計，不寫檔
+  python3 scraper/compact.py --verify
+
+  # 精簡檔解回正本格式
+  python3 scraper/compact.py --decode schedules.compact.json --output /tmp/schedules.json
+"""
+
+import argparse
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+from store import SCHEDULES_JSON, atomic_write
+from validate import SLOTS
+
+COMPACT_JSON = SCHEDULES_JSON.with_name("schedules.compact.json")
+FORMAT_VERSION = 1
+SESSION_KEYS = ("id", "doctor_name", "clinic_id", "date", "slot", "time_label", "source_note")
+DATE_MARK = "~"
+
+
+class _Table:
+    """字串 → 索引（依首次出現順序）。"""
+
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, value):
+        if value is None:
+            return None
+        return self.index.setdefault(value, len(self.index))
+
+    def values(self) -> list:
+        return list(self.index)
+
+
+def encode(data: dict) -> dict:
+    """正本 dict → 精簡 dict。遇到無法無損編碼的 session 丟 ValueError。"""
+    sessions = data["sessions"]
+    clinic_index = {c["id"]: i for i, c in enumerate(data["clinics"])}
+    slot_index = {slot: i for i, slot in enumerate(SLOTS)}
+    base = date.fromisoformat(min(s["date"] for s in sessions)) if sessions else date.today()
+    doctors, labels, notes, patterns = _Table(), _Table(), _Table(), _Table()
+    day_of = {}
+
+    rows = []
+    for i, s in enumerate(sessions):
+        extra = set(s) - set(SESSION_KEYS)
+        if extra:
+            raise ValueError(f"sessions[{i}] 有精簡格式不支援的欄位：{sorted(extra)}")
+        if s["clinic_id"] not in clinic_index:
+            raise ValueError(f"sessions[{i}] clinic_id 不在 clinics：{s['clinic_id']}")
+        if s["slot"] not in slot_index:
+            raise ValueError(f"sessions[{i}] 未知 slot：{s['slot']}")
+        d = s["date"]
+        if d not in day_of:
+            day_of[d] = (date.fromisoformat(d) - base).days
+        sid = s["id"]
+        mmdd = d[5:7] + d[8:10]
+        if mmdd in sid and DATE_MARK not in sid:
+            sid = patterns(sid.replace(mmdd, DATE_MARK, 1))
+        rows.append([sid, clinic_index[s["clinic_id"]], doctors(s["doctor_name"]), day_of[d],
+                     slot_index[s["slot"]], labels(s.get("time_label")), notes(s.get("source_note"))])
+
+    compact = {k: v for k, v in data.items() if k != "sessions"}
+    compact.update({
+        "format": FORMAT_VERSION,
+        "base": base.isoformat(),
+        "slots": SLOTS,
+        "doctors": doctors.values(),
+        "labels": labels.values(),
+        "notes": notes.values(),
+        "id_patterns": patterns.values(),
+        "sessions": rows,
+    })
+    return compact
+
+
+def decode(compact: dict) -> dict:
+    """精簡 dict → 正本 dict（session 欄位順序固定為 SESSION_KEYS）。"""
+    if compact.get("format") != FORMAT_VERSION:
+        raise ValueError(f"不支援的精簡格式版本：{compact.get('format')}")
+    base = date.fromisoformat(compact["base"])
+    clinic_ids = [c["id"] for c in compact["clinics"]]
+    slots, doctors = compact["slots"], compact["doctors"]
+    labels, notes, patterns = compact["labels"], compact["notes"], compact["id_patterns"]
+    dates = {}
+
+    sessions = []
+    for sid, clinic, doctor, day, slot, label, note in compact["sessions"]:
+        if day not in dates:
+            dates[day] = (base + timedelta(days=day)).isoformat()
+        d = dates[day]
+        if isinstance(sid, int):
+            sid = patterns[sid].replace(DATE_MARK, d[5:7] + d[8:10], 1)
+        s = {"id": sid, "doctor_name": doctors[doctor], "clinic_id": clinic_ids[clinic],
+             "date": d, "slot": slots[slot]}
+        if label is not None:
+            s["time_label"] = labels[label]
+        if note is not None:
+            s["source_note"] = notes[note]
+        sessions.append(s)
+
+    meta_keys = ("format", "base", "slots", "doctors", "labels", "notes", "id_patterns", "sessions")
+    data = {k: v for k, v in compact.items() if k not in meta_keys}
+    data["sessions"] = sessions
+    return data
+
+
+def dumps(compact: dict) -> str:
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+
+def verify_round_trip(data: dict) -> dict:
+    """encode → 序列化 → 解析 → decode，確認與原資料相等；不相等丟 ValueError。回傳精簡 dict。"""
+    compact = encode(data)
+    restored = decode(json.loads(dumps(compact)))
+    if restored != data:
+        bad = next((i for i, (a, b) in enumerate(zip(data["sessions"], restored["sessions"]))
+                    if a != b), None)
+        raise ValueError(f"精簡格式來回比對不一致（第一筆差異 sessions[{bad}]）")
+    return compact
+
+
+def write(data: dict, path: Path = COMPACT_JSON) -> int:
+    """來回比對通過後原子寫入精簡檔，回傳 bytes 數。"""
+    body = dumps(verify_round_trip(data))
+    atomic_write(path, body)
+    return len(body.encode("utf-8"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="schedules.json 精簡編碼")
+    ap.add_argument("--verify", action="store_true", help="只做來回比對與大小統計，不寫檔")
+    ap.add_argument("--decode", metavar="COMPACT_JSON", help="把精簡檔解回正本格式")
+    ap.add_argument("--output", help="--decode 的輸出路徑（預設印到 stdout）")
+    args = ap.parse_args()
+
+    if args.decode:
+        # 與 schedules.json 相同格式（檔尾無換行），可直接 cmp
+        with open(args.decode, encoding="utf-8") as f:
+            text = json.dumps(decode(json.load(f)), ensure_ascii=False, indent=2)
+        if args.output:
+            Path(args.output).write_text(text, encoding="utf-8")
+            print(f"已輸出 → {args.output}")
+        else:
+            print(text)
+        return
+
+    raw = SCHEDULES_JSON.read_bytes()
+    data = json.loads(raw)
+    if args.verify:
+        size = len(dumps(verify_round_trip(data)).encode("utf-8"))
+    else:
+        size = write(data)
+    print(f"✅ 來回比對一致（{len(data['sessions'])} 筆 sessions）")
+    print(f"   正本 {len(raw):,} bytes → 精簡 {size:,} bytes（{len(raw) / size:.1f}x）")
+    if not args.verify:
+        print(f"   已寫入 {COMPACT_JSON}")
+
+
+if __name__ == "__main__":
+    main()
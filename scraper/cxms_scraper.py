@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+CXMS 班表爬蟲 — web.cxms.com.tw/{代碼}/hosp.php 靜態 HTML 週班表
+
+班表直接嵌在 HTML 表格裡（只顯示當週），不需開瀏覽器。取代 SOP 類型 A 的 curl 迴圈 + 貼上解析：
+  - CXMS_CLINICS 全部同時抓取（同一 host 的同時數 / 速率由 fetch.py 的 "cxms" 設定限制）
+  - 一列一個診次（上午一診、夜間二診…），第 1 格為診次名稱，其後依序為週一 ~ 週六（有的到週日）
+  - 醫師名兩種格式：多數診所 `<br>醫師名`，c25 上禾為 `<h2>醫師名</h2>`
+  - 先讀表頭日期確認頁面是要抓的那一週，不符就當抓取失敗、不寫回；再由欄位的星期幾推算日期
+    （c19 得揚表頭有時顯示上週日期，僅此情形照星期幾對應）
+  - 一診 / 二診各自成一筆 session（id 例：wn_m2_0630）
+
+經 httpcache 條件式請求抓取；--update-schedules 時，頁面與上次寫回時相同且範圍已涵蓋的診所
+直接略過（--force 強制重寫）。
+
+用法：
+  # 抓全部 CXMS 診所本週班表，列印（不寫回）
+  python3 scraper/cxms_scraper.py --all
+
+  # 週日執行：預設抓下週（週日視為下週的前一天）
+  python3 scraper/cxms_scraper.py --all --update-schedules
+
+  # 單一診所，輸出 sessions JSON
+  python3 scraper/cxms_scraper.py --clinic c25 --output /tmp/c25.json
+
+  # 錄下 / 離線重播（--start-date 須為本週或下週；其他週只能搭配 --replay 重播當時錄下的頁面）
+  python3 scraper/cxms_scraper.py --all --record /tmp/rec/cxms
+  python3 scraper/cxms_scraper.py --all --replay /tmp/rec/cxms --start-date 2026-06-29
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import fetch
+from httpcache import HTTPCache
+from store import Transaction, print_conflicts, print_overlaps, print_report
+
+SCRAPER_DIR = Path(__file__).parent
+SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
+
+BASE_URL = "http://web.cxms.com.tw/{code}/hosp.php"   # 必須用 HTTP，HTTPS 會拒絕連線
+
+# CXMS 診所（c03 富新改走 hixcare_scraper）；code 同時是 session ID 前綴
+CXMS_CLINICS = {
+    "c02": {"name": "維恩骨科", "code": "wn"},
+    "c04": {"name": "得安診所", "code": "da"},
+    "c05": {"name": "昌惟骨科", "code": "cw"},
+    "c06": {"name": "昌禾骨科", "code": "ch"},
+    "c07": {"name": "土城杏光", "code": "xq"},
+    "c19": {"name": "得揚診所", "code": "dy"},
+    "c20": {"name": "力康骨科", "code": "lk"},
+    "c25": {"name": "上禾骨科", "code": "sh"},
+}
+
+# 表頭日期有時顯示上週（系統 bug）的診所：頁面比要求早一週時仍照星期幾對應
+STALE_HEADER_CLINICS = {"c19"}
+
+# 診次名稱開頭 → (slot, ID 簡碼, time_label, source_note 前綴)
+SLOT_MAP = (
+    (("上午", "早"), ("morning",   "m", "上午 08:30–12:00", "上午")),
+    (("下午", "午"), ("afternoon", "a", "下午 14:00–17:00", "下午")),
+    (("夜", "晚"),   ("evening",   "e", "夜診 18:00–21:00", "夜間")),
+)
+
+# 診次名稱中的診號 → 用於 ID 與 source_note
+ROOM_SEQ = {"一": "1", "二": "2", "三": "3"}
+SEQ_NAME = {v: k for k, v in ROOM_SEQ.items()}
+
+# 格子裡抓到的中文不是醫師名時略過
+NOT_DOCTORS = {"空", "休診", "停診", "休息", "暫停"}
+
+# 多數診所 <tr align='center'>，c25 上禾 <tr bgcolor='…'>
+ROW_PATTERN = re.compile(r"<tr(?:\s+align='center'[^>]*|\s+bgcolor='[^']*')>(.*?)</tr>", re.DOTALL)
+CELL_PATTERN = re.compile(r"<td[^>]*>(.*?)</td>", re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+# 表頭列（任何 <tr>，格子可能是 <th> 或 <td>）
+HEADER_ROW_PATTERN = re.compile(r"<tr[^>]*>(.*?)</tr>", re.DOTALL)
+HEADER_CELL_PATTERN = re.compile(r"<t[hd][^>]*>(.*?)</t[hd]>", re.DOTALL)
+# 表頭日期：2026/06/29、115.06.29（民國）、06/29、6月29日
+DATE_PATTERN = re.compile(r"(?<!\d)(?:(\d{3,4})\s*[/.\-年]\s*)?(\d{1,2})\s*[/.\-月]\s*(\d{1,2})(?!\d)")
+DOCTOR_PATTERNS = (
+    re.compile(r"<br\s*/?>\s*([\u4e00-\u9fff]+)"),       # <br> 後接中文（多數 CXMS）
+    re.compile(r"<h2>\s*([\u4e00-\u9fff]+)\s*</h2>"),    # <h2>中文</h2>（c25 上禾）
+)
+
+
+def clinic_url(clinic_id: str) -> str:
+    return BASE_URL.format(code=CXMS_CLINICS[clinic_id]["code"])
+
+
+def week_monday(day: datetime) -> datetime:
+    """day 所在週的週一；週日視為下週（每週日預先抓下週，CXMS 此時已顯示下週）。"""
+    if day.weekday() == 6:
+        day += timedelta(days=1)
+    return day - timedelta(days=day.weekday())
+
+
+def parse_shift(diag: str) -> tuple:
+    """'上午一診' → (slot, 簡碼, time_label, '上午', '1')；認不得回 None。"""
+    for prefixes, shift in SLOT_MAP:
+        if diag.startswith(prefixes):
+            seq = next((n for ch, n in ROOM_SEQ.items() if ch in diag), "1")
+            return shift + (seq,)
+    return None
+
+
+def parse_doctor(cell: str) -> str:
+    for pattern in DOCTOR_PATTERNS:
+        m = pattern.search(cell)
+        if m:
+            return None if m.group(1) in NOT_DOCTORS else m.group(1)
+    return None
+
+
+def first_shift_row(html: str) -> int:
+    """第一個診次列在 html 中的起點；在它之前的是標題 / 表頭列。沒有診次列時回 len(html)。"""
+    for row in ROW_PATTERN.finditer(html):
+        cells = CELL_PATTERN.findall(row.group(1))
+        if cells and parse_shift(TAG_PATTERN.sub("", cells[0]).strip()):
+            return row.start()
+    return len(html)
+
+
+def cell_date(cell: str, monday: datetime) -> datetime:
+    """格子裡的第一個日期；沒寫年份的取最接近 monday 的年份。沒有日期回 None。"""
+    for year, month, day in DATE_PATTERN.findall(TAG_PATTERN.sub(" ", cell)):
+        if year:
+            years = [int(year) + 1911 if len(year) == 3 else int(year)]
+        else:
+            years = [monday.year - 1, monday.year, monday.year + 1]
+        candidates = []
+        for y in years:
+            try:
+                candidates.append(datetime(y, int(month), int(day)))
+            except ValueError:
+                continue
+        if candidates:
+            return min(candidates, key=lambda c: abs(c - monday))
+    return None
+
+
+def page_monday(html: str, monday: datetime) -> datetime:
+    """
+    頁面表頭日期所在週的週一。表頭列 = 第一個診次列之前、帶日期的格子最多的 <tr>；
+    只看該列各格的日期（不看 script / link 等其他文字），多數格子落在哪週就算哪週。
+    找不到表頭日期回 None。
+    """
+    best = []
+    for row in HEADER_ROW_PATTERN.findall(html[:first_shift_row(html)]):
+        dates = [d for d in (cell_date(c, monday) for c in HEADER_CELL_PATTERN.findall(row)) if d]
+        if len(dates) > len(best):
+            best = dates
+    weeks = {}
+    for d in best:
+        week = d - timedelta(days=d.weekday())
+        weeks[week] = weeks.get(week, 0) + 1
+    return max(weeks, key=weeks.get) if weeks else None
+
+
+def parse_rows(html: str) -> list:
+    """[(診次名稱, [週一醫師, 週二醫師, …])]，沒有醫師的格子為 None；第一個診次列之前的表頭列略過。"""
+    rows = []
+    for row in ROW_PATTERN.finditer(html, first_shift_row(html)):
+        cells = CELL_PATTERN.findall(row.group(1))
+        if not cells:
+            continue
+        diag = TAG_PATTERN.sub("", cells[0]).strip()
+        if diag:
+            rows.append((diag, [parse_doctor(c) for c in cells[1:8]]))
+    return rows
+
+
+def sessions_from_rows(clinic_id: str, rows: list, monday: datetime) -> tuple:
+    """依欄位星期幾換算日期，回傳 (sessions, 認不得的診次名稱)。"""
+    code = CXMS_CLINICS[clinic_id]["code"]
+    sessions, unknown = [], []
+    for diag, doctors in rows:
+        shift = parse_shift(diag)
+        if shift is None:
+            unknown.append(diag)
+            continue
+        slot, scode, time_label, prefix, seq = shift
+        for weekday, doctor in enumerate(doctors):
+            if not doctor:
+                continue
+            day = monday + timedelta(days=weekday)
+            sessions.append({
+                "id": f"{code}_{scode}{seq}_{day.strftime('%m%d')}",
+                "doctor_name": doctor,
+                "clinic_id": clinic_id,
+                "date": day.strftime("%Y-%m-%d"),
+                "slot": slot,
+                "time_label": time_label,
+                "source_note": f"{prefix}{SEQ_NAME[seq]}診",
+            })
+    return sessions, unknown
+
+
+async def build_sessions(clinic_id: str, monday: datetime, cache: HTTPCache) -> tuple:
+    """抓取並轉成 sessions，回傳 (sessions, 認不得的診次, resp)。抓取失敗丟 fetch.SourceError。"""
+    try:
+        resp = await cache.get(clinic_url(clinic_id), headers={"Accept": fetch.HTML_ACCEPT})
+    except Exception as e:
+        raise fetch.SourceError(f"{clinic_id} CXMS 班表抓取失敗：{e}") from e
+    html = resp.text("utf-8")
+    shown = page_monday(html, monday)
+    if shown is None:
+        raise fetch.SourceError(f"{clinic_id} 頁面表頭找不到日期，無法確認是哪一週的班表")
+    if shown != monday and not (clinic_id in STALE_HEADER_CLINICS and shown == monday - timedelta(days=7)):
+        raise fetch.SourceError(f"{clinic_id} 頁面為 {shown:%Y-%m-%d} 當週班表，"
+                                f"不是要抓的 {monday:%Y-%m-%d} 當週")
+    sessions, unknown = sessions_from_rows(clinic_id, parse_rows(html), monday)
+    return sessions, unknown, resp
+
+
+async def build_all(monday: datetime, clinic_ids=None, cache: HTTPCache = None) -> dict:
+    """
+    CXMS_CLINICS 全部（或指定的 clinic_ids）同時抓取。
+    回傳 {clinic_id: (sessions, unknown, resp) 或 fetch.SourceError}，順序同 CXMS_CLINICS。
+    """
+    cache = cache or HTTPCache()
+    ids = [c for c in CXMS_CLINICS if clinic_ids is None or c in clinic_ids]
+    results = await asyncio.gather(*(build_sessions(c, monday, cache) for c in ids),
+                                   return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException) and not isinstance(r, fetch.SourceError):
+            raise r
+    return dict(zip(ids, results))
+
+
+def print_sessions(sessions: list) -> None:
+    order = [shift[0] for _, shift in SLOT_MAP]
+    for s in sorted(sessions, key=lambda x: (x["date"], order.index(x["slot"]), x["id"])):
+        print(f"    {s['date']} {s['source_note']:<4} {s['doctor_name']:<5} {s['time_label']}")
+
+
+def run(clinic_ids: list, monday: datetime, output=None, update=False, force=False, verbose=False):
+    """抓取、列印；--output 輸出全部 sessions；--update-schedules 時一個 Transaction 一次寫回。"""
+    date_from = monday.strftime("%Y-%m-%d")
+    date_to = (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+    print(f"CXMS {len(clinic_ids)} 家　範圍：{date_from} ~ {date_to}")
+
+    cache = HTTPCache()
+    t0 = time.perf_counter()
+    results = fetch.run(build_all(monday, clinic_ids, cache))
+    ok, failed, skipped = {}, [], []
+    for clinic_id, result in results.items():
+        name = CXMS_CLINICS[clinic_id]["name"]
+        if isinstance(result, fetch.SourceError):
+            print(f"  ❌ {clinic_id} {name}：{result}")
+            failed.append(clinic_id)
+            continue
+        sessions, unknown, resp = result
+        if update and not force and cache.processed(resp, date_from, date_to):
+            print(f"  ⏭️  {clinic_id} {name}：頁面與上次寫回時相同，略過")
+            skipped.append(clinic_id)
+            continue
+        print(f"  {clinic_id} {name}：{len(sessions)} 筆門診"
+              + (f"，認不得的診次：{', '.join(unknown)}" if unknown else ""))
+        if verbose:
+            print_sessions(sessions)
+        if not sessions:
+            # 假日整週停診或版面變了：不拿空資料刪掉既有的 sessions
+            print(f"  ⚠️  {clinic_id} 抓到 0 筆，不寫回（保留既有 sessions）")
+            failed.append(clinic_id)
+            continue
+        ok[clinic_id] = (sessions, resp)
+    print(f"  ⏱️  {time.perf_counter() - t0:.2f}s（{fetch.client().stats_line()}）")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump([s for ss, _ in ok.values() for s in ss], f, ensure_ascii=False, indent=2)
+        print(f"已輸出 → {output}")
+
+    if update and ok:
+        txn = Transaction(SCHEDULES_JSON)
+        for clinic_id, (sessions, _) in ok.items():
+            txn.replace(clinic_id, sessions, date_from, date_to)
+        report = txn.commit()
+        for _, resp in ok.values():
+            cache.mark_processed(resp, date_from, date_to)
+        print(f"✅ 已寫回 schedules.json（總 sessions {txn.total}）")
+        print_report(report)
+        print_conflicts(txn.store, txn.conflicts)
+        print_overlaps(txn.store, txn.overlaps)
+    if failed:
+        raise SystemExit(f"⚠️  未寫回：{', '.join(failed)}（既有 sessions 不動）")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="CXMS 班表爬蟲")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--clinic", nargs="+", choices=sorted(CXMS_CLINICS), help="診所代碼，例 c02 c25")
+    target.add_argument("--all", action="store_true", help="CXMS_CLINICS 全部同時抓取、一次寫回")
+    ap.add_argument("--start-date", help="該週任一天 YYYY-MM-DD（預設今天；週日視為下週）；"
+                                         "CXMS 只顯示當週，非本週 / 下週須搭配 --replay")
+    ap.add_argument("--output", help="輸出 sessions JSON 到檔案")
+    ap.add_argument("--update-schedules", action="store_true", help="直接寫回 schedules.json")
+    ap.add_argument("--force", action="store_true", help="頁面未變動也重新寫回")
+    fetch.add_capture_arguments(ap)
+    args = ap.parse_args()
+    fetch.configure(args)
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else today
+    monday = week_monday(start)
+    this_monday = today - timedelta(days=today.weekday())
+    if not args.replay and monday not in (this_monday, this_monday + timedelta(days=7)):
+        ap.error(f"--start-date {args.start_date} 不在本週或下週；CXMS 只顯示當週班表，"
+                 f"其他週請用 --replay 重播當時錄下的頁面")
+    clinic_ids = list(CXMS_CLINICS) if args.all else args.clinic
+    run(clinic_ids, monday, args.output, args.update_schedules, args.force,
+        verbose=not args.all)
+
+
+if __name__ == "__main__":
+    main()
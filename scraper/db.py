@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+schedules.db — 選用的 SQLite 班表資料庫（標準庫 sqlite3）
+
+schedules.json 仍是前端與 git 的正本；schedules.db 給查詢與多支爬蟲同時寫入用：
+  - sessions 表索引：(clinic_id, date)、(doctor_name, date, slot)、id
+  - 範圍替換 = 走索引的 DELETE + executemany INSERT，包在同一個 SQLite transaction，
+    不必重寫整份 JSON；多程序同時寫入由 SQLite 的鎖排隊（BEGIN IMMEDIATE）
+  - 匯出：依寫入順序（seq）還原 Spec.md 的 JSON 格式，欄位順序、缺欄位、
+    meta / clinics 內容都原樣保留；從 schedules.json 匯入後立即匯出，內容與順序都與原檔相同
+
+用法：
+  # schedules.json → schedules.db（整份重建）
+  python3 scraper/db.py --import
+
+  # schedules.db → schedules.json（持鎖原子寫回，重建 data/ 等衍生檔）
+  python3 scraper/db.py --export
+  python3 scraper/db.py --export --output /tmp/schedules.json
+
+  # 檢查 db 匯出結果是否與 schedules.json 相同
+  python3 scraper/db.py --check
+
+  # 範圍替換直接寫進 db（一個 SQLite transaction）
+  python3 scraper/db.py --replace c24 /tmp/jr_sessions.json 2026-06-29 2026-08-02
+
+  # 查詢
+  python3 scraper/db.py --query --clinic c02 --date-from 2026-06-29 --date-to 2026-07-05
+  python3 scraper/db.py --query --doctor 陳振軒
+
+爬蟲端：Transaction.commit_db() 把排入的範圍替換寫進 db（weekly_run.py / store.py 加 --db）。
+"""
+
+import argparse
+import json
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from store import (REQUIRED_KEYS, SCHEDULES_JSON, ScheduleStore, _recover_locked, conflict_problems,
+                   parse_replace, print_conflicts, print_report, schedule_lock, slot_key, write_derived)
+from validate import Validator, format_problems, validate
+
+SCHEDULES_DB = SCHEDULES_JSON.with_name("schedules.db")
+
+MAX_DATE = "9999-12-31"    # 未指定迄日時的上限
+COLUMNS = ("id", "doctor_name", "clinic_id", "date", "slot", "time_label", "source_note")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS document (
+    pos   INTEGER PRIMARY KEY,      -- 頂層欄位順序
+    key   TEXT NOT NULL UNIQUE,
+    value TEXT                      -- JSON；sessions 本身存在 sessions 表，此處為 NULL
+);
+CREATE TABLE IF NOT EXISTS clinics (
+    pos   INTEGER PRIMARY KEY,
+    id    TEXT NOT NULL UNIQUE,
+    body  TEXT NOT NULL             -- 診所設定 JSON（原樣）
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,  -- 輸出順序
+    id          TEXT,
+    doctor_name TEXT,
+    clinic_id   TEXT,
+    date        TEXT,
+    slot        TEXT,
+    time_label  TEXT,
+    source_note TEXT,
+    keys        TEXT,               -- 欄位順序與 COLUMNS 不同或有缺欄位時才記（JSON 陣列）
+    extra       TEXT                -- COLUMNS 以外的欄位（JSON 物件）
+);
+CREATE INDEX IF NOT EXISTS sessions_clinic_date ON sessions (clinic_id, date);
+CREATE INDEX IF NOT EXISTS sessions_doctor_slot ON sessions (doctor_name, date, slot);
+CREATE INDEX IF NOT EXISTS sessions_id ON sessions (id);
+"""
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _row(session: dict) -> tuple:
+    """session dict → sessions 表一列（不含 seq）。"""
+    keys = list(session)
+    extra = {k: v for k, v in session.items() if k not in COLUMNS}
+    order = None if tuple(keys) == COLUMNS else _dumps(keys)
+    return (*(session.get(k) for k in COLUMNS), order, _dumps(extra) if extra else None)
+
+
+def _session(row: sqlite3.Row) -> dict:
+    """sessions 表一列 → session dict（還原欄位順序與缺欄位）。"""
+    values = {k: row[k] for k in COLUMNS}
+    if row["extra"]:
+        values.update(json.loads(row["extra"]))
+    keys = json.loads(row["keys"]) if row["keys"] else COLUMNS
+    return {k: values[k] for k in keys}
+
+
+class ScheduleDB:
+    """
+    schedules.db 存取。
+
+      db = ScheduleDB()
+      with db.transaction():
+          db.replace_range("c03", sessions, "2026-06-29", "2026-07-05")
+      db.export()       # 寫回 schedules.json
+    """
+
+    def __init__(self, path: Path = SCHEDULES_DB):
+        self.path = Path(path)
+        # isolation_level=None：自行下 BEGIN IMMEDIATE，寫入前就取得寫鎖
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @contextmanager
+    def transaction(self):
+        """區塊內所有寫入為同一個 SQLite transaction；例外時整批 rollback。"""
+        if self.conn.in_transaction:
+            yield
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # ── 匯入 / 匯出 ──────────────────────────────────────
+
+    def import_dict(self, data: dict) -> int:
+        """以 schedules.json 內容整份重建 db，回傳 sessions 數。"""
+        with self.transaction():
+            for table in ("document", "clinics", "sessions"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("DELETE FROM sqlite_sequence WHERE name = 'sessions'")
+            self.conn.executemany(
+                "INSERT INTO document (pos, key, value) VALUES (?, ?, ?)",
+                [(i, k, None if k == "sessions" else _dumps(v)) for i, (k, v) in enumerate(data.items())])
+            self.conn.executemany("INSERT INTO clinics (pos, id, body) VALUES (?, ?, ?)",
+                                  [(i, c["id"], _dumps(c)) for i, c in enumerate(data["clinics"])])
+            self._insert(data["sessions"])
+        return len(data["sessions"])
+
+    def import_json(self, path: Path = SCHEDULES_JSON) -> int:
+        with open(path, encoding="utf-8") as f:
+            return self.import_dict(json.load(f))
+
+    def to_dict(self) -> dict:
+        """db → schedules.json 格式 dict（sessions 依 seq 排序）。"""
+        rows = self.conn.execute("SELECT key, value FROM document ORDER BY pos").fetchall()
+        if not rows:
+            raise ValueError(f"{self.path} 尚未匯入（先執行 db.py --import）")
+        data = {}
+        for row in rows:
+            if row["key"] == "sessions":
+                data["sessions"] = self.sessions()
+            elif row["key"] == "clinics":
+                data["clinics"] = self.clinics()
+            else:
+                data[row["key"]] = json.loads(row["value"])
+        return data
+
+    def export(self, path: Path = SCHEDULES_JSON) -> int:
+        """
+        持 schedule_lock 原子寫回 JSON（更新 meta.generated_at）並重建衍生檔，回傳 sessions 數。
+        """
+        with schedule_lock(path):
+            _recover_locked(path)
+            previous = ScheduleStore.load(path).sessions() if Path(path).exists() else []
+            data = self.to_dict()
+            problems = format_problems(validate(data), data["sessions"])
+            if problems:
+                raise ValueError("sessions 檢查未通過，未匯出：\n  " + "\n  ".join(problems))
+            store = ScheduleStore(data, path)
+            store.save()
+            write_derived(store, previous)
+        return len(store)
+
+    # ── 查詢 ──────────────────────────────────────────────
+
+    def clinics(self) -> list:
+        return [json.loads(r["body"]) for r in self.conn.execute("SELECT body FROM clinics ORDER BY pos")]
+
+    def sessions(self, where: str = "", params: tuple = ()) -> list:
+        sql = f"SELECT * FROM sessions {'WHERE ' + where if where else ''} ORDER BY seq"
+        return [_session(r) for r in self.conn.execute(sql, params)]
+
+    def sessions_for(self, clinic_id: str, date_from: str = None, date_to: str = None) -> list:
+        """該診所 [date_from, date_to] 內的 sessions，依日期排序。"""
+        rows = self.conn.execute(
+            "SELECT * FROM sessions WHERE clinic_id = ? AND date >= ? AND date <= ? ORDER BY date, seq",
+            (clinic_id, date_from or "", date_to or MAX_DATE))
+        return [_session(r) for r in rows]
+
+    def at(self, doctor_name: str, date: str, slot: str) -> list:
+        return self.sessions("doctor_name = ? AND date = ? AND slot = ?", (doctor_name, date, slot))
+
+    def conflicts(self, keys=None) -> dict:
+        """
+        (doctor_name, date, slot) → sessions，只列出現兩筆以上者（走 doctor/date/slot 索引分組）。
+        指定 keys 時只查這些 key，每個 key 一次索引查詢。
+        """
+        if keys is not None:
+            found = {key: self.at(*key) for key in dict.fromkeys(keys)}
+            return {key: entries for key, entries in found.items() if len(entries) > 1}
+        found = {}
+        rows = self.conn.execute(
+            "SELECT s.* FROM sessions s JOIN (SELECT doctor_name, date, slot FROM sessions"
+            " GROUP BY doctor_name, date, slot HAVING COUNT(*) > 1) d"
+            " USING (doctor_name, date, slot) ORDER BY s.seq")
+        for r in rows:
+            found.setdefault((r["doctor_name"], r["date"], r["slot"]), []).append(_session(r))
+        return found
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # ── 寫入 ──────────────────────────────────────────────
+
+    def _insert(self, sessions: list) -> None:
+        self.conn.executemany(
+            f"INSERT INTO sessions ({', '.join(COLUMNS)}, keys, extra)"
+            f" VALUES ({', '.join('?' * (len(COLUMNS) + 2))})",
+            [_row(s) for s in sessions])
+
+    def ensure_clinic(self, clinic: dict) -> None:
+        """clinics 沒有該 id 時加到最後。"""
+        with self.transaction():
+            pos = self.conn.execute("SELECT COALESCE(MAX(pos) + 1, 0) FROM clinics").fetchone()[0]
+            self.conn.execute("INSERT OR IGNORE INTO clinics (pos, id, body) VALUES (?, ?, ?)",
+                              (pos, clinic["id"], _dumps(clinic)))
+
+    def replace_range(self, clinic_id: str, sessions: list,
+                      date_from: str = None, date_to: str = None) -> int:
+        """刪除該診所 [date_from, date_to] 的舊 sessions 並補入 sessions，回傳刪除筆數。"""
+        with self.transaction():
+            removed = self.conn.execute(
+                "DELETE FROM sessions WHERE clinic_id = ? AND date >= ? AND date <= ?",
+                (clinic_id, date_from or "", date_to or MAX_DATE)).rowcount
+            self._insert(sessions)
+        return removed
+
+    def check(self, ops: list) -> list:
+        """
+        （需在 transaction 內、套用後呼叫）檢查本次新增的 sessions，規則同 Transaction.check：
+        只驗新增的部分（validate 的逐筆規則），id 重複走 id 索引查整個 db。
+        """
+        clinic_ids = [r["id"] for r in self.conn.execute("SELECT id FROM clinics")]
+        v = Validator(clinic_ids)
+        problems = []
+        added = [s for _, sessions, _, _ in ops for s in sessions]
+        for clinic_id, sessions, _, _ in ops:
+            for s in sessions:
+                missing = [k for k in REQUIRED_KEYS if k not in s or s[k] is None]
+                if missing:
+                    problems.append(f"{clinic_id} {s.get('id')}: 缺欄位 {', '.join(missing)}")
+                if s.get("clinic_id") != clinic_id:
+                    problems.append(f"{clinic_id} {s.get('id')}: clinic_id 為 {s.get('clinic_id')}，與替換對象不符")
+        for i, s in enumerate(added):
+            v.check(i, s)
+        problems += [f"新增 {line}" for line in format_problems(v.problems, added)]
+        batch = Counter(s.get("id") for s in added)   # 批次內重複已由 Validator 回報
+        for sid, n in batch.items():
+            if self.conn.execute("SELECT COUNT(*) FROM sessions WHERE id = ?", (sid,)).fetchone()[0] > n:
+                problems.append(f"session id 重複：{sid}（與 db 既有 session）")
+        return problems
+
+    def replace_ranges(self, ops: list, clinics: list = (), reject_conflicts: bool = False) -> tuple:
+        """
+        一個 SQLite transaction 內套用多筆範圍替換 [(clinic_id, sessions, date_from, date_to)]，
+        檢查失敗（或 reject_conflicts 且有衝突）時整批 rollback 並丟 ValueError。
+        回傳 (每診所 (刪舊, 新增), 本次新增 sessions 涉入的衝突)。
+        """
+        report = {}
+        with self.transaction():
+            for clinic in clinics:
+                self.ensure_clinic(clinic)
+            for clinic_id, sessions, date_from, date_to in ops:
+                removed = self.replace_range(clinic_id, sessions, date_from, date_to)
+                prev_removed, prev_added = report.get(clinic_id, (0, 0))
+                report[clinic_id] = (prev_removed + removed, prev_added + len(sessions))
+            found = self.conflicts(slot_key(s) for _, sessions, _, _ in ops for s in sessions)
+            problems = self.check(ops) + (conflict_problems(found) if reject_conflicts else [])
+            if problems:
+                raise ValueError("sessions 檢查未通過，未寫回：\n  " + "\n  ".join(problems))
+        return report, found
+
+
+def run(db: ScheduleDB, args) -> None:
+    if args.import_:
+        n = db.import_json()
+        print(f"✅ 已匯入 {n} 筆 sessions → {db.path}")
+
+    if args.replace:
+        ops = []
+        for values in args.replace:
+            clinic_id, sessions, date_from, date_to = parse_replace(values)
+            print(f"  {clinic_id} {date_from} ~ {date_to}：{len(sessions)} 筆")
+            ops.append((clinic_id, sessions, date_from, date_to))
+        report, found = db.replace_ranges(ops, reject_conflicts=args.reject_conflicts)
+        print(f"✅ 已寫入 {db.path}（總 sessions {len(db)}）")
+        print_report(report)
+        print_conflicts(ScheduleStore({"clinics": db.clinics()}), found)
+
+    if args.export:
+        path = Path(args.output) if args.output else SCHEDULES_JSON
+        n = db.export(path)
+        print(f"✅ 已匯出 {n} 筆 sessions → {path}")
+
+    if args.check:
+        with open(SCHEDULES_JSON, encoding="utf-8") as f:
+            current = json.load(f)
+        # 比對序列化結果（含欄位順序），不比縮排 / 檔尾換行
+        if _dumps(db.to_dict()) != _dumps(current):
+            print(f"⚠️  {db.path} 與 schedules.json 不同步（--import 或 --export 同步）")
+            raise SystemExit(1)
+        print(f"✅ {db.path} 與 schedules.json 相同（{len(db)} 筆 sessions）")
+
+    if args.query:
+        where, params = [], []
+        for column, value in (("clinic_id = ?", args.clinic), ("doctor_name = ?", args.doctor),
+                              ("date >= ?", args.date_from), ("date <= ?", args.date_to)):
+            if value:
+                where.append(column)
+                params.append(value)
+        rows = db.sessions(" AND ".join(where), tuple(params))
+        for s in sorted(rows, key=lambda x: (x["date"], x["clinic_id"], x["id"])):
+            print(f"  {s['date']} {s['clinic_id']} {s['slot']:<9} {s['doctor_name']:<6} {s['id']}")
+        print(f"共 {len(rows)} 筆")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="schedules.db（SQLite）")
+    ap.add_argument("--db", default=str(SCHEDULES_DB), help="資料庫路徑（預設 schedules.db）")
+    ap.add_argument("--import", dest="import_", action="store_true", help="schedules.json → db（整份重建）")
+    ap.add_argument("--export", action="store_true", help="db → schedules.json")
+    ap.add_argument("--output", help="--export 輸出路徑（預設 schedules.json）")
+    ap.add_argument("--check", action="store_true", help="檢查 db 匯出結果與 schedules.json 是否相同")
+    ap.add_argument("--replace", nargs="+", action="append", default=[],
+                    metavar="CLINIC SESSIONS_JSON [DATE_FROM DATE_TO]",
+                    help="範圍替換寫進 db；可重複，全部同一個 transaction")
+    ap.add_argument("--reject-conflicts", action="store_true", help="--replace 有衝突時整批不寫入")
+    ap.add_argument("--query", action="store_true", help="查詢 sessions")
+    ap.add_argument("--clinic", help="--query 診所 ID")
+    ap.add_argument("--doctor", help="--query 醫師")
+    ap.add_argument("--date-from", help="--query 起日")
+    ap.add_argument("--date-to", help="--query 迄日")
+    args = ap.parse_args()
+
+    with ScheduleDB(args.db) as db:
+        try:
+            run(db, args)
+        except ValueError as e:
+            raise SystemExit(f"⚠️  {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+schedules.json 版本間差異（delta）— 讓持有舊版的 client 只抓小補丁
+
+以 session `id` 為身分比對前後兩版：
+  added   新版才有的 sessions（完整內容）
+  removed 舊版才有的 session id
+  changed id 相同但內容不同的 sessions（新版完整內容）
+
+輸出到 data/deltas/：
+  manifest.json              版本鏈：latest、base（鏈上最舊可補到的版本）、各版 hash、各段 delta 檔
+  {from}-{to}.json           單段 delta
+
+版本號為遞增整數；hash 為 sessions 依 id 排序後的內容 hash（與順序無關）。
+持有版本 N 的 client 依序套用 N→N+1→…→latest 的 delta，套完比對 hash；
+N < base 或 hash 不符時改抓整份資料。鏈只保留最近 MAX_CHAIN 段。
+
+Transaction.commit 每次寫回後自動記一段；其他情況可手動：
+  # 以 git 某版為舊版，比對目前 schedules.json 並記一段 delta
+  python3 scraper/delta.py --since-git HEAD
+
+  # 指定兩個檔案
+  python3 scraper/delta.py --prev /tmp/old.json --new schedules.json
+
+  # 查看版本鏈
+  python3 scraper/delta.py --status
+
+  # 與 git 舊版比對時連同 archive/ 封存的 sessions（只印差異，不記入版本鏈）
+  python3 scraper/delta.py --since-git HEAD~10 --with-archive
+
+版本鏈只追蹤 live 的 schedules.json：retention.py 封存舊 sessions 也會記成一段（removed），
+client 照常套用即可。
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from store import SCHEDULES_JSON, atomic_write
+
+DELTA_SUBDIR = Path("data") / "deltas"
+MAX_CHAIN = 30
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def content_hash(sessions: list) -> str:
+    """與順序無關的 sessions 內容 hash。"""
+    h = hashlib.sha256()
+    for s in sorted(sessions, key=lambda x: x["id"]):
+        h.update(_dumps(s).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()[:16]
+
+
+def _by_id(sessions: list) -> dict:
+    """id → session；有重複 id 時回 None（身分不明確，無法做 delta）。"""
+    out = {}
+    for s in sessions:
+        if s["id"] in out:
+            return None
+        out[s["id"]] = s
+    return out
+
+
+def diff(prev: list, new: list) -> dict:
+    """比對兩版 sessions，回傳 {"added", "removed", "changed"}；有重複 id 時回 None。"""
+    old_map, new_map = _by_id(prev), _by_id(new)
+    if old_map is None or new_map is None:
+        return None
+    added = [s for sid, s in new_map.items() if sid not in old_map]
+    removed = [sid for sid in old_map if sid not in new_map]
+    changed = [s for sid, s in new_map.items() if sid in old_map and old_map[sid] != s]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def apply_delta(sessions: list, delta: dict) -> list:
+    """把一段 delta 套到 sessions（舊版）上，回傳新版 sessions（順序：保留者原順序、新增者在後）。"""
+    drop = set(delta["removed"])
+    changed = {s["id"]: s for s in delta["changed"]}
+    out = [changed.get(s["id"], s) for s in sessions if s["id"] not in drop]
+    out.extend(delta["added"])
+    return out
+
+
+def _delta_dir(schedules_path: Path) -> Path:
+    return Path(schedules_path).parent / DELTA_SUBDIR
+
+
+def load_chain(schedules_path: Path = SCHEDULES_JSON) -> dict:
+    path = _delta_dir(schedules_path) / "manifest.json"
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(prev: list, new: list, schedules_path: Path = SCHEDULES_JSON) -> dict:
+    """
+    記錄 prev → new 一段 delta 並更新版本鏈，回傳該段摘要；內容沒變回 None。
+    鏈上最新版的 hash 與 prev 不符（中間有人手動改過 schedules.json）或有重複 id 時，
+    不產生 delta、鏈從新版重新起算（舊 client 會改抓整份資料）。
+    """
+    out_dir = _delta_dir(schedules_path)
+    prev_hash, new_hash = content_hash(prev), content_hash(new)
+    if prev_hash == new_hash:
+        return None
+    now = datetime.now().isoformat(timespec="seconds")
+    chain = load_chain(schedules_path)
+    if chain is None:
+        chain = {"latest": 1, "base": 1, "versions": [{"version": 1, "hash": prev_hash, "at": now}],
+                 "deltas": []}
+
+    delta = diff(prev, new) if chain["versions"][-1]["hash"] == prev_hash else None
+    version = chain["latest"] + 1
+    chain["versions"].append({"version": version, "hash": new_hash, "at": now})
+    chain["latest"] = version
+    summary = None
+    if delta is None:
+        for d in chain["deltas"]:
+            (out_dir / d["file"]).unlink(missing_ok=True)
+        chain["deltas"], chain["base"] = [], version
+    else:
+        name = f"{version - 1}-{version}.json"
+        body = _dumps({"from": version - 1, "to": version, "from_hash": prev_hash,
+                       "to_hash": new_hash, **delta})
+        out_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(out_dir / name, body)
+        summary = {"from": version - 1, "to": version, "file": name,
+                   "bytes": len(body.encode("utf-8")),
+                   **{k: len(v) for k, v in delta.items()}}
+        chain["deltas"].append(summary)
+        for old in chain["deltas"][:-MAX_CHAIN]:
+            (out_dir / old["file"]).unlink(missing_ok=True)
+        chain["deltas"] = chain["deltas"][-MAX_CHAIN:]
+        chain["base"] = chain["deltas"][0]["from"]
+    chain["versions"] = [v for v in chain["versions"] if v["version"] >= chain["base"]]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write(out_dir / "manifest.json", _dumps(chain))
+    return summary
+
+
+def _load_git(rev: str, path: Path) -> dict:
+    path = Path(path).resolve()
+    text = subprocess.run(["git", "show", f"{rev}:./{path.name}"], cwd=path.parent,
+                          capture_output=True, text=True, check=True).stdout
+    return json.loads(text)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="schedules.json 版本間差異")
+    ap.add_argument("--prev", help="舊版 schedules.json 路徑")
+    ap.add_argument("--since-git", metavar="REV", help="以 git REV 的 schedules.json 為舊版")
+    ap.add_argument("--new", default=str(SCHEDULES_JSON), help="新版路徑（預設 schedules.json）")
+    ap.add_argument("--status", action="store_true", help="查看版本鏈")
+    ap.add_argument("--with-archive", action="store_true",
+                    help="新版連同 archive/ 封存的 sessions 比對（只印差異，不記入版本鏈）")
+    args = ap.parse_args()
+
+    if args.prev or args.since_git:
+        if args.since_git:
+            prev = _load_git(args.since_git, Path(args.new))
+        else:
+            with open(args.prev, encoding="utf-8") as f:
+                prev = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        if args.with_archive:
+            from retention import with_archive
+            d = diff(prev["sessions"], with_archive(new["sessions"], Path(args.new)))
+            if d is None:
+                raise SystemExit("⚠️  有重複 id，無法比對")
+            print(f"新增 {len(d['added'])} / 刪除 {len(d['removed'])} / 變更 {len(d['changed'])}（含封存）")
+            return
+        summary = record(prev["sessions"], new["sessions"], Path(args.new))
+        if summary is None:
+            chain = load_chain(Path(args.new))
+            print("內容無變動，未記錄" if content_hash(prev["sessions"]) == content_hash(new["sessions"])
+                  else f"⚠️  無法產生 delta，版本鏈重新起算於 v{chain['latest']}")
+        else:
+            print(f"✅ v{summary['from']} → v{summary['to']}：新增 {summary['added']} / "
+                  f"刪除 {summary['removed']} / 變更 {summary['changed']}（{summary['bytes']:,} bytes）")
+
+    chain = load_chain(Path(args.new))
+    if args.status or not (args.prev or args.since_git):
+        if chain is None:
+            print("尚無版本鏈")
+            return
+        print(f"最新 v{chain['latest']}，可補丁起點 v{chain['base']}，共 {len(chain['deltas'])} 段")
+        for d in chain["deltas"]:
+            print(f"  v{d['from']} → v{d['to']}  +{d['added']} -{d['removed']} ~{d['changed']}"
+                  f"  {d['bytes']:,} bytes  {d['file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,11 @@
 補入 c01/c08/c12/c13/c14 固定班表的 3月份 sessions（3/2–3/31）
 直接從現有的週班週期延伸
 """
-import json
 from datetime import date
-from pathlib import Path
 
-SCHEDULES_FILE = Path('/Users/yezuhao/Projects/scraper/schedules.json')
+from store import Transaction, print_conflicts, print_overlaps
 
-with open(SCHEDULES_FILE, encoding='utf-8') as f:
-    data = json.load(f)
+txn = Transaction()
 
 # March 2026 dates (Mon–Sat)
 MARCH_DATES = [date(2026, 3, d) for d in range(1, 32)]
@@ -107,20 +104,11 @@ PREFIX_MAP = {
 
 SLOT_CHAR = {'morning':'m','afternoon':'a','evening':'e'}
 
-# Get existing March dates for these clinics (to avoid duplicates)
-march_date_strs = {str(d) for d in MARCH_DATES}
+MARCH_FROM, MARCH_TO = str(MARCH_DATES[0]), str(MARCH_DATES[-1])
 
 for clinic_id, schedule in FIXED_SCHEDULES.items():
     prefix = PREFIX_MAP[clinic_id]
-    
-    # Remove any existing March sessions for this clinic (avoid duplicates)
-    existing_count = len(data['sessions'])
-    data['sessions'] = [
-        s for s in data['sessions']
-        if not (s['clinic_id'] == clinic_id and s['date'] in march_date_strs)
-    ]
-    removed = existing_count - len(data['sessions'])
-    
+
     new_sessions = []
     for d in MARCH_DATES:
         day_name = DAY_MAP[d.weekday()]
@@ -141,25 +129,17 @@ for clinic_id, schedule in FIXED_SCHEDULES.items():
                     'source_note': '固定班表 2026-03-02 延伸',
                 })
     
-    data['sessions'].extend(new_sessions)
-    print(f'[{clinic_id}] 刪除舊:{removed} 新增:{len(new_sessions)}')
+    # Remove any existing March sessions for this clinic (avoid duplicates), then add
+    txn.replace(clinic_id, new_sessions, MARCH_FROM, MARCH_TO)
+
+report = txn.commit()
+for clinic_id, (removed, added) in report.items():
+    print(f'[{clinic_id}] 刪除舊:{removed} 新增:{added}')
+store = txn.store
 
-# Conflict check
-from collections import defaultdict
-clinics = {c['id']: c['name'] for c in data['clinics']}
-conflicts = defaultdict(list)
-for s in data['sessions']:
-    key = (s['doctor_name'], s['date'], s['slot'])
-    conflicts[key].append((s['clinic_id'], clinics.get(s['clinic_id'], s['clinic_id'])))
-found = False
-for key, entries in conflicts.items():
-    if len(entries) > 1:
-        print(f'⚠️ 衝突: {key}')
-        for e in entries: print(f'  → {e}')
-        found = True
-if not found:
+# Conflict check（只查本次新增 sessions 的 醫師/日期/時段）
+if not print_conflicts(store, txn.conflicts):
     print('✅ 無衝突')
+print_overlaps(store, txn.overlaps)
 
-with open(SCHEDULES_FILE, 'w', encoding='utf-8') as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
-print(f'✅ 儲存完成，總 sessions: {len(data["sessions"])}')
+print(f'✅ 儲存完成，總 sessions: {len(store)}')
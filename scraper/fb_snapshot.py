@@ -3,8 +3,8 @@
 社群媒體快照工具 - 適用於 Facebook、LINE VOOM 等社群平台
 功能：
 1. 使用 Selenium 截圖社群媒體頁面（不嘗試解析 HTML）
-2. 快照存於 snapshots/social/{clinic_id}/
-3. 產生 metadata JSON（URL、截圖時間、截圖路徑）
+2. 快照 meta 存於 snapshots/social/{clinic_id}/，截圖依內容雜湊存在 snapshots/objects/（snapshot_store）
+3. 產生 metadata JSON（URL、截圖時間、截圖 sha256 與路徑；與上一份相同時 changed 為 false）
 4. 人工從截圖轉錄到 schedules.json
 
 社群媒體診所：
@@ -38,6 +38,10 @@ import time
 from datetime import datetime
 from pathlib import Path
 
+import fetch
+import snapshot_store
+from store import load_clinics
+
 SCRAPER_DIR = Path(__file__).parent
 SNAPSHOT_DIR = SCRAPER_DIR / "snapshots" / "social"
 SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
@@ -56,10 +60,8 @@ SOCIAL_CLINICS = {
 
 def load_clinic_urls() -> dict:
     """從 schedules.json 讀取社群媒體診所的 URL"""
-    with open(SCHEDULES_JSON, encoding="utf-8") as f:
-        data = json.load(f)
     urls = {}
-    for c in data["clinics"]:
+    for c in load_clinics(SCHEDULES_JSON):
         if c["id"] in SOCIAL_CLINICS:
             urls[c["id"]] = c.get("source_url", "")
     return urls
@@ -77,8 +79,8 @@ def take_screenshot(clinic_id: str, url: str, clinic_name: str, platform: str) -
     回傳快照結果 dict
     """
     clinic_dir = get_clinic_dir(clinic_id)
-    clinic_dir.mkdir(parents=True, exist_ok=True)
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    png = None
 
     result = {
         "clinic_id": clinic_id,
@@ -111,6 +113,7 @@ def take_screenshot(clinic_id: str, url: str, clinic_name: str, platform: str) -
         driver = webdriver.Chrome(options=options)
         try:
             print(f"  🌐 開啟 {url} ...")
+            fetch.rate_limit_sync(url)  # 同 host 的開頁間隔依 fetch.RATE_LIMITS["facebook"]
             driver.get(url)
             time.sleep(4)  # 等待頁面載入
 
@@ -131,14 +134,9 @@ def take_screenshot(clinic_id: str, url: str, clinic_name: str, platform: str) -
             driver.execute_script("window.scrollBy(0, 400);")
             time.sleep(1)
 
-            # 截圖
-            screenshot_file = clinic_dir / f"{date_str}_screenshot.png"
-            driver.save_screenshot(str(screenshot_file))
-            result["screenshot_file"] = str(screenshot_file)
+            # 截圖（存檔由下方 snapshot_store.save 處理）
+            png = driver.get_screenshot_as_png()
             result["success"] = True
-
-            print(f"  ✅ {clinic_name}: 截圖已儲存")
-            print(f"     → {screenshot_file}")
             if result["needs_login"]:
                 print(f"     ⚠️  需要登入，請手動截圖並用 --add-screenshot 加入")
 
@@ -159,24 +157,26 @@ def take_screenshot(clinic_id: str, url: str, clinic_name: str, platform: str) -
         "platform": platform,
         "url": url,
         "snapshot_at": datetime.now().isoformat(),
-        "screenshot_file": result.get("screenshot_file"),
+        "screenshot_file": None,
         "success": result["success"],
         "needs_login": result.get("needs_login", False),
         "error": result.get("error"),
         "transcribed": False,  # 人工轉錄後改為 True
         "transcription_notes": "",
     }
-    meta_file = clinic_dir / f"{date_str}_meta.json"
-    meta_file.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-    result["meta_file"] = str(meta_file)
+    meta = snapshot_store.save(clinic_dir, date_str, meta, png, ".png", file_key="screenshot_file")
+    result["screenshot_file"] = meta["screenshot_file"]
+    result["meta_file"] = meta["meta_file"]
+    if png is not None:
+        state = "截圖已儲存" if meta["changed"] else "截圖與上一份相同，只記 meta"
+        print(f"  ✅ {clinic_name}: {state}")
+        print(f"     → {meta['screenshot_file']}")
 
     return result
 
 
 def add_screenshot_manually(clinic_id: str, screenshot_path: str, note: str = ""):
     """手動加入截圖（當自動截圖失敗時使用）"""
-    import shutil
-
     if clinic_id not in SOCIAL_CLINICS:
         print(f"❌ 未知診所 ID: {clinic_id}")
         return
@@ -187,28 +187,23 @@ def add_screenshot_manually(clinic_id: str, screenshot_path: str, note: str = ""
         print(f"❌ 找不到截圖: {screenshot_path}")
         return
 
-    clinic_dir = get_clinic_dir(clinic_id)
-    clinic_dir.mkdir(parents=True, exist_ok=True)
-
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    dest = clinic_dir / f"{date_str}_manual_{src.name}"
-    shutil.copy2(src, dest)
-
-    meta = {
+    meta = snapshot_store.save(get_clinic_dir(clinic_id), date_str, {
         "clinic_id": clinic_id,
         "clinic_name": info["name"],
         "platform": info["platform"],
         "snapshot_at": datetime.now().isoformat(),
-        "screenshot_file": str(dest),
         "source": "manual",
+        "source_file": src.name,
         "notes": note,
         "transcribed": False,
         "transcription_notes": "",
-    }
-    meta_file = clinic_dir / f"{date_str}_manual_meta.json"
-    meta_file.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    }, src.read_bytes(), src.suffix.lower(), file_key="screenshot_file", name="manual_meta")
 
-    print(f"✅ 手動截圖已加入: {dest}")
+    if meta["changed"]:
+        print(f"✅ 手動截圖已加入: {meta['screenshot_file']}")
+    else:
+        print(f"✅ 手動截圖與上一份相同（sha256 {meta['sha256'][:12]}），只記 meta")
 
 
 def mark_transcribed(clinic_id: str, note: str = ""):
@@ -252,7 +247,7 @@ def show_status():
 
         latest = json.loads(meta_files[0].read_text(encoding="utf-8"))
         snapshot_at = latest.get("snapshot_at", "")[:16].replace("T", " ")
-        has_screenshot = "✅" if latest.get("screenshot_file") and Path(latest.get("screenshot_file", "")).exists() else "❌"
+        has_screenshot = "✅" if snapshot_store.exists(latest, "screenshot_file") else "❌"
         transcribed = "✅" if latest.get("transcribed") else "⏳"
         notes = latest.get("transcription_notes", "")[:20]
 
@@ -273,7 +268,6 @@ def run_all():
             continue
         r = take_screenshot(clinic_id, url, info["name"], info["platform"])
         results.append(r)
-        time.sleep(3)
 
     success = sum(1 for r in results if r["success"])
     needs_login = sum(1 for r in results if r.get("needs_login"))
@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+共用 HTTP 抓取層（asyncio）— 所有爬蟲的網路請求都走這裡
+
+每支爬蟲原本各自 urllib.request.urlopen，一個接一個等。改成：
+  - 一個 Client：共用 headers（User-Agent / Accept-Language）、timeout
+  - 每個 host 一個 semaphore 限制同時請求數（預設 HOST_CONCURRENCY），不同 host 互不影響
+  - 請求本身用標準庫 http.client（不引入外部依賴），丟到 asyncio 的 thread pool 執行，
+    多個來源用 asyncio.gather 同時跑，整體時間約等於最慢的那個來源
+  - 連線池：每個 (scheme, host) 保留用完的 keep-alive 連線，下一個請求直接沿用，
+    省掉重複的 TCP + TLS 握手（vision 每週一個 POST、104 每頁一個 GET 都打同一個 host）。
+    client.stats 記錄開過幾條連線 / 發過幾個請求，stats_line() 印在各爬蟲結尾
+  - 速率限制：每個 host 一個 token bucket（整個程序共用），依來源類型設定每秒請求數與突發量
+    （RATE_LIMITS / HOST_SOURCES）。不同 host 各自前進，同一 host 不論幾支爬蟲同時跑都不超過上限；
+    取代原本各爬蟲寫死的 sleep。非 HTTP 的存取（fb_snapshot 的 Selenium）用 rate_limit_sync(url)
+  - 重試與斷路器：冪等請求（GET / HEAD，或呼叫端標明 idempotent=True 的查詢 POST）遇到逾時、
+    連線被重設 / 中斷、429 / 5xx 時，以加入隨機抖動的指數退避重試最多 MAX_RETRIES 次；
+    憑證錯誤、連線被拒等重試也不會好的錯誤直接丟出，不算進斷路器；
+    同一 host 連續失敗 BREAKER_THRESHOLD 次後斷路 BREAKER_COOLDOWN 秒，期間直接丟 CircuitOpen，
+    不再打已經掛掉的站。爬蟲抓取失敗時丟 SourceError，呼叫端據此「不做範圍替換」，
+    避免用空的 / 缺週的資料把好的 sessions 刪掉
+  - 錄製 / 重播：--record DIR 把每個請求與回應存到 DIR，--replay DIR 完全不連網、
+    從 DIR 取回應（找不到就丟 ReplayMiss），用來離線重跑解析 → 寫回流程、做效能量測或 CI。
+    各爬蟲以 add_capture_arguments(parser) 加上這兩個參數、configure(args) 套用到預設 Client
+
+用法（程式內）：
+  import fetch
+
+  async def main():
+      client = fetch.client()
+      a, b = await asyncio.gather(
+          client.get("https://www.kaomei.com.tw/hours.asp?id=37"),
+          client.post(url, json_body={"dateFrom": "2026-06-29"}),
+      )
+      html = a.text()
+      data = b.json()
+
+  fetch.run(main())
+
+  # 單一請求、同步呼叫
+  html = fetch.get_sync(url).text()
+
+用法（命令列，除錯用）：
+  python3 scraper/fetch.py https://web.cxms.com.tw/wn/hosp.php https://www.kaomei.com.tw/hours.asp?id=37
+"""
+
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/121.0.0.0 Safari/537.36")
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+}
+HTML_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+DEFAULT_TIMEOUT = 15
+HOST_CONCURRENCY = 2
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# 來源類型 → (每秒補充 token 數, 桶容量 = 可連續送出的請求數)
+RATE_LIMITS = {
+    "cxms": (1.0, 8),            # 每週一次抓 8 家：一次送完，之後每秒 1 個
+    "hixcare": (2.0, 4),
+    "vision": (2.0, 4),
+    "facebook": (1 / 3, 1),
+    "104": (5.0, 6),
+    "default": (2.0, 4),
+}
+# 來源類型 → 同一 host 同時進行的請求數（未列出者用 Client.host_limit）
+SOURCE_CONCURRENCY = {
+    "cxms": 4,
+    "104": 6,
+}
+# host（或其上層網域）→ 來源類型
+HOST_SOURCES = {
+    "web.cxms.com.tw": "cxms",
+    "hixcare.tw": "hixcare",
+    "vision.com.tw": "vision",
+    "facebook.com": "facebook",
+    "linevoom.line.me": "facebook",
+    "104.com.tw": "104",
+}
+
+# 重試：只重試冪等請求；暫時性錯誤 = 逾時 / 連線被重設或中斷 / 下列狀態碼
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# 憑證錯誤、連線被拒、找不到檔案等其他 OSError 重試也不會好：直接丟出，不算進斷路器
+TRANSIENT_ERRORS = (TimeoutError, socket.timeout, ConnectionResetError, ConnectionAbortedError,
+                    http.client.RemoteDisconnected, http.client.IncompleteRead)
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5     # 第 n 次重試前等 uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n)) 秒
+BACKOFF_CAP = 8.0
+
+# 斷路器：同一 host 連續失敗 BREAKER_THRESHOLD 次後，BREAKER_COOLDOWN 秒內不再送出請求
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+
+# 錄製模式不送條件式請求：錄下的一律是完整回應，重播時與快取狀態無關
+CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+# 沿用中的連線若已被伺服器關閉，送出時會丟這些錯誤；換一條新連線重送一次
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+DEFAULT_SSL = ssl.create_default_context()
+
+# 部分站台（例 vision.com.tw）SSL 憑證鏈不完整：verify=False 時用這個 context
+INSECURE_SSL = ssl.create_default_context()
+INSECURE_SSL.check_hostname = False
+INSECURE_SSL.verify_mode = ssl.CERT_NONE
+
+
+class HTTPError(Exception):
+    """非 2xx / 3xx 回應。"""
+
+    def __init__(self, url: str, status: int, reason: str = ""):
+        super().__init__(f"HTTP {status}: {reason}（{url}）")
+        self.url = url
+        self.status = status
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    token bucket：每秒補 rate 個 token、最多存 burst 個，每個請求取一個。
+    reserve() 先扣 token、回傳需等待的秒數（不足時 token 變負數，後到的排在後面），
+    以 threading.Lock 保護，asyncio 與一般 thread 都能共用同一個 bucket。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self) -> None:
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class CircuitOpen(Exception):
+    """host 斷路中（連續失敗過多），請求未送出。"""
+
+
+class SourceError(Exception):
+    """
+    來源抓取失敗（重試後仍失敗、斷路中、或只抓到部分資料）。
+    呼叫端遇到時不可做範圍替換：保留 schedules.json 既有的 sessions。
+    """
+
+
+class CircuitBreaker:
+    """
+    連續失敗 threshold 次後打開 cooldown 秒。冷卻後放行（半開），
+    再失敗立刻重新打開，成功一次即關閉並歸零。
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self, host: str) -> None:
+        with self._lock:
+            if self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown:
+                raise CircuitOpen(f"{host} 連續失敗 {self.failures} 次，斷路中（{self.cooldown:.0f}s 後再試）")
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.failures, self._opened_at = 0, None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self._opened_at = time.monotonic()
+
+
+def is_transient(error: Exception) -> bool:
+    """值得重試、也算進斷路器的錯誤：逾時 / 連線重設或中斷 / 429 / 5xx（ssl.SSLError 不算）。"""
+    if isinstance(error, HTTPError):
+        return error.status in RETRY_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS) and not isinstance(error, ssl.SSLError)
+
+
+def backoff_delay(attempt: int) -> float:
+    """full jitter：同時失敗的多個請求錯開重試時間。"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+_buckets = {}
+_breakers = {}
+_buckets_lock = threading.Lock()
+
+
+def source_type(host: str) -> str:
+    """host → RATE_LIMITS 的來源類型（比對 host 本身或上層網域）。"""
+    host = host.split(":")[0].lower()
+    for suffix, source in HOST_SOURCES.items():
+        if host == suffix or host.endswith("." + suffix):
+            return source
+    return "default"
+
+
+def bucket_for(host: str) -> TokenBucket:
+    """每個 host 一個 bucket，整個程序共用（所有 Client、所有爬蟲）。"""
+    host = host.split(":")[0].lower()
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*RATE_LIMITS[source_type(host)])
+        return _buckets[host]
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    """每個 host 一個斷路器，整個程序共用。"""
+    host = host.split(":")[0].lower()
+    with _buckets_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def rate_limit_sync(url: str) -> None:
+    """不經 Client 的存取（例如 Selenium 開頁）前呼叫，與 HTTP 請求共用同一個 host 上限。"""
+    bucket_for(urllib.parse.urlsplit(url).netloc).acquire_sync()
+
+
+class ReplayMiss(Exception):
+    """--replay 時，錄製目錄裡沒有這個請求。"""
+
+
+def request_key(method: str, url: str, body: bytes = None) -> str:
+    """錄製檔名：method + url + body 的雜湊（headers 不列入）。"""
+    h = hashlib.sha1(f"{method} {url}\n".encode("utf-8"))
+    h.update(body or b"")
+    return h.hexdigest()[:20]
+
+
+class Response:
+    def __init__(self, url: str, status: int, headers: dict, body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers      # header 名稱一律小寫
+        self.body = body
+        self.unchanged = False      # httpcache.HTTPCache.get：body 與上次相同
+
+    @property
+    def charset(self) -> str:
+        for part in self.headers.get("content-type", "").split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return None
+
+    def text(self, encoding: str = None) -> str:
+        """解碼 body：指定 encoding > Content-Type charset > utf-8；無法解碼的字元以 � 取代。"""
+        return self.body.decode(encoding or self.charset or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Client:
+    """
+    asyncio HTTP client。同一個 host 最多 host_limit 個請求同時進行，其餘排隊；
+    semaphore 綁定 event loop，換 loop（例如另一次 fetch.run）時自動重建。
+    閒置的 keep-alive 連線放在 _idle，跨 fetch.run 沿用，close() 時關閉。
+    record_dir / replay_dir 擇一設定時進入錄製 / 重播模式。
+    """
+
+    def __init__(self, headers: dict = None, timeout: float = DEFAULT_TIMEOUT,
+                 host_limit: int = HOST_CONCURRENCY, host_limits: dict = None,
+                 record_dir: Path = None, replay_dir: Path = None):
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.timeout = timeout
+        self.host_limit = host_limit
+        self.host_limits = dict(host_limits or {})   # host → 個別上限
+        self._loop = None
+        self._semaphores = {}
+        self._idle = {}                # (scheme, host, verify) → [閒置連線]
+        self._lock = threading.Lock()  # _send 在 thread pool 執行，_idle / stats 要上鎖
+        self.stats = {"connections": 0, "requests": 0, "retries": 0}
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+
+    @property
+    def capturing(self) -> bool:
+        """錄製或重播中（httpcache 此時不讀寫快取）。"""
+        return bool(self.record_dir or self.replay_dir)
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._semaphores = loop, {}
+        if host not in self._semaphores:
+            limit = self.host_limits.get(host, SOURCE_CONCURRENCY.get(source_type(host), self.host_limit))
+            self._semaphores[host] = asyncio.Semaphore(limit)
+        return self._semaphores[host]
+
+    async def request(self, method: str, url: str, *, params: dict = None, data=None,
+                      json_body=None, headers: dict = None, timeout: float = None,
+                      verify: bool = True, idempotent: bool = None) -> Response:
+        """
+        發一個請求並回傳 Response。
+        params 併入 query string；data 為 dict 時以 form urlencoded 送出；json_body 以 JSON 送出。
+        3xx 自動跟隨（最多 MAX_REDIRECTS 次），4xx / 5xx 丟 HTTPError，
+        連線錯誤 / 逾時照原樣丟出（OSError / TimeoutError），host 斷路中丟 CircuitOpen。
+        idempotent 預設依 method（GET / HEAD）；只查詢不改資料的 POST 可傳 True 以啟用重試。
+        """
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urllib.parse.urlencode(params)}"
+        merged = {**self.headers, **(headers or {})}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            merged.setdefault("Content-Type", "application/json")
+        elif isinstance(data, dict):
+            body = urllib.parse.urlencode(data).encode("utf-8")
+            merged.setdefault("Content-Type", "application/x-www-form-urlencoded")
+        elif data is not None:
+            body = data if isinstance(data, bytes) else str(data).encode("utf-8")
+        if self.replay_dir:
+            return self._replay(method, url, body)
+        if self.record_dir:
+            merged = {k: v for k, v in merged.items() if k.lower() not in CONDITIONAL_HEADERS}
+        host = urllib.parse.urlsplit(url).netloc
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = MAX_RETRIES if idempotent else 0
+        breaker = breaker_for(host)
+        for attempt in range(retries + 1):
+            breaker.check(host)
+            try:
+                async with self._semaphore(host):
+                    await bucket_for(host).acquire()
+                    resp = await asyncio.to_thread(self._send, method, url, body, merged,
+                                                   timeout or self.timeout, verify)
+                breaker.record(True)
+                break
+            except Exception as e:
+                transient = is_transient(e)
+                if transient:
+                    breaker.record(False)
+                elif isinstance(e, HTTPError):
+                    breaker.record(True)    # 4xx 代表站台有回應，不算失敗
+                if not transient or attempt == retries:
+                    if self.record_dir and isinstance(e, HTTPError):
+                        self._record(method, url, body, e.url, e.status, e.reason, {}, b"")
+                    raise
+            with self._lock:
+                self.stats["retries"] += 1
+            await asyncio.sleep(backoff_delay(attempt))
+        if self.record_dir:
+            self._record(method, url, body, resp.url, resp.status, "", resp.headers, resp.body)
+        return resp
+
+    async def get(self, url: str, **kwargs) -> Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> Response:
+        return await self.request("POST", url, **kwargs)
+
+    def _record(self, method: str, url: str, body: bytes, final_url: str, status: int,
+                reason: str, headers: dict, data: bytes) -> None:
+        key = request_key(method, url, body)
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "method": method,
+            "url": url,
+            "request_body": body.decode("utf-8", errors="replace") if body else None,
+            "final_url": final_url,
+            "status": status,
+            "reason": reason,
+            "headers": headers,
+        }
+        (self.record_dir / f"{key}.body").write_bytes(data)
+        (self.record_dir / f"{key}.json").write_text(
+            json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def _replay(self, method: str, url: str, body: bytes) -> Response:
+        key = request_key(method, url, body)
+        meta_path = self.replay_dir / f"{key}.json"
+        if not meta_path.exists():
+            raise ReplayMiss(f"{self.replay_dir} 沒有錄到這個請求：{method} {url}")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        with self._lock:
+            self.stats["requests"] += 1
+        if meta["status"] >= 400:
+            raise HTTPError(meta["final_url"], meta["status"], meta["reason"])
+        return Response(meta["final_url"], meta["status"], meta["headers"],
+                        (self.replay_dir / f"{key}.body").read_bytes())
+
+    def _send(self, method: str, url: str, body: bytes, headers: dict,
+              timeout: float, verify: bool) -> Response:
+        for _ in range(MAX_REDIRECTS + 1):
+            status, reason, resp_headers, data = self._roundtrip(method, url, body, headers,
+                                                                 timeout, verify)
+            location = resp_headers.get("location")
+            if status not in REDIRECT_STATUSES or not location:
+                break
+            url = urllib.parse.urljoin(url, location)
+            if status in (301, 302, 303) and method == "POST":
+                # 同 urllib：POST 轉址後改用 GET、不帶 body
+                method, body = "GET", None
+                headers = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+        else:
+            raise HTTPError(url, status, "轉址次數過多")
+        if status >= 400:
+            raise HTTPError(url, status, reason)
+        return Response(url, status, resp_headers, data)
+
+    def _roundtrip(self, method: str, url: str, body: bytes, headers: dict,
+                   timeout: float, verify: bool) -> tuple:
+        """在池中的連線上送一個請求，回傳 (status, reason, headers, body)。"""
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc, verify)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        conn, reused = self._acquire(key, timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # 閒置連線已被對方關閉：開新連線重送一次
+            conn = self._connect(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self.stats["requests"] += 1
+            if not resp.will_close:
+                self._idle.setdefault(key, []).append(conn)
+        if resp.will_close:
+            conn.close()
+        return resp.status, resp.reason, {k.lower(): v for k, v in resp.getheaders()}, data
+
+    def _acquire(self, key: tuple, timeout: float) -> tuple:
+        """取一條閒置連線（沿用時 reused=True），沒有就開新的。"""
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return self._connect(key, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _connect(self, key: tuple, timeout: float) -> http.client.HTTPConnection:
+        scheme, netloc, verify = key
+        with self._lock:
+            self.stats["connections"] += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=timeout,
+                                               context=DEFAULT_SSL if verify else INSECURE_SSL)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=timeout)
+        raise ValueError(f"不支援的網址：{scheme}://{netloc}")
+
+    def stats_line(self) -> str:
+        line = f"HTTP：{self.stats['requests']} 個請求 / {self.stats['connections']} 條連線"
+        if self.stats["retries"]:
+            line += f" / 重試 {self.stats['retries']} 次"
+        if self.replay_dir:
+            return f"{line}（重播 {self.replay_dir}）"
+        if self.record_dir:
+            return f"{line}（錄製到 {self.record_dir}）"
+        return line
+
+    def close(self) -> None:
+        """關閉所有閒置連線。"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+_client = None
+
+
+def client() -> Client:
+    """整個程序共用的預設 Client。"""
+    global _client
+    if _client is None:
+        _client = Client()
+    return _client
+
+
+def add_capture_arguments(parser: argparse.ArgumentParser) -> None:
+    """加上 --record DIR / --replay DIR（互斥）。"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="把所有 HTTP 請求與回應錄到 DIR")
+    group.add_argument("--replay", metavar="DIR", help="不連網，從 DIR 重播錄好的回應")
+
+
+def configure(args) -> Client:
+    """依 --record / --replay 設定預設 Client。"""
+    c = client()
+    c.record_dir = Path(args.record) if getattr(args, "record", None) else None
+    c.replay_dir = Path(args.replay) if getattr(args, "replay", None) else None
+    return c
+
+
+def run(coro):
+    """同步程式的進入點：跑完 coroutine 並回傳結果。"""
+    return asyncio.run(coro)
+
+
+def get_sync(url: str, **kwargs) -> Response:
+    return run(client().get(url, **kwargs))
+
+
+def post_sync(url: str, **kwargs) -> Response:
+    return run(client().post(url, **kwargs))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="共用 HTTP 抓取層（同時抓多個 URL，印出耗時）")
+    ap.add_argument("urls", nargs="+")
+    add_capture_arguments(ap)
+    args = ap.parse_args()
+    configure(args)
+
+    async def one(url):
+        t0 = time.perf_counter()
+        try:
+            resp = await client().get(url, headers={"Accept": HTML_ACCEPT})
+            note = f"{resp.status} {len(resp.body):,} bytes"
+        except Exception as e:
+            note = f"❌ {e}"
+        print(f"  {time.perf_counter() - t0:6.2f}s  {note}  {url}")
+
+    async def all_urls():
+        await asyncio.gather(*(one(u) for u in args.urls))
+
+    t0 = time.perf_counter()
+    run(all_urls())
+    print(f"共 {len(args.urls)} 個 URL，{time.perf_counter() - t0:.2f}s（{client().stats_line()}）")
+
+
+if __name__ == "__main__":
+    main()
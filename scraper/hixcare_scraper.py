@@ -38,17 +38,32 @@ API（base 為各診所 hixcare 子網域，例 https://fcbone-schedule.hixcare.
 
   # 直接寫回 schedules.json（刪該診所該範圍舊 sessions、補入新的、更新 generated_at）
   python3 hixcare_scraper.py --clinic c03 --update-schedules
+
+  # HIXCARE_CLINICS 全部同時查詢（每家一個 regSchedule/find 涵蓋整個範圍），一次寫回
+  python3 hixcare_scraper.py --all --weeks 2 --update-schedules
+
+  # 錄下 API 回應，之後離線重播（不連網，供效能量測 / CI）
+  python3 hixcare_scraper.py --clinic c03 --record /tmp/rec/c03
+  python3 hixcare_scraper.py --clinic c03 --replay /tmp/rec/c03 --output /tmp/c03.json
 """
 
 import argparse
+import asyncio
 import json
-import urllib.request
 from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
+
+import fetch
+from store import Transaction, atomic_write, print_conflicts, print_overlaps, print_report
 
 SCRAPER_DIR = Path(__file__).parent
 SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
 
+# getHixConfig 很少變：快取在 cache/hixcare/{host}.json，CONFIG_TTL 內不重抓
+CONFIG_CACHE_DIR = SCRAPER_DIR / "cache" / "hixcare"
+CONFIG_TTL = timedelta(days=7)
+
 # hixcare 診所設定。未來有別家搬 hixcare，照樣加一筆即可。
 HIXCARE_CLINICS = {
     "c03": {
@@ -71,28 +86,41 @@ SLOT_MAP = {
 ROOM_SEQ = {"一診": "1", "二診": "2"}
 
 
-def _http_json(url, payload=None, timeout=15):
+async def _http_json(url, payload=None, timeout=15):
     """發 GET（payload=None）或 POST（payload=dict）並回傳解析後的 JSON。"""
-    data = None
-    headers = {"Content-Type": "application/json"}
-    if payload is not None:
-        data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=data, headers=headers,
-                                 method="POST" if data else "GET")
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-
-def get_hix_config(base_url):
-    """取得診所系統設定（含 HOSPITAL_ID / 科別等）。"""
-    res = _http_json(f"{base_url}/hixLocal/sysConfig/getHixConfig")
-    return res.get("result", {}) if res.get("code") == 0 else {}
-
-
-def fetch_schedule(base_url, date_from, date_to):
+    if payload is None:
+        resp = await fetch.client().get(url, headers={"Content-Type": "application/json"}, timeout=timeout)
+    else:
+        # regSchedule/find 只是查詢：標成 idempotent 讓 fetch 失敗時重試
+        resp = await fetch.client().post(url, json_body=payload, timeout=timeout, idempotent=True)
+    return resp.json()
+
+
+async def get_hix_config(base_url, max_age=CONFIG_TTL):
+    """
+    取得診所系統設定（含 HOSPITAL_ID / 科別等）。
+    成功的結果快取在 CONFIG_CACHE_DIR，max_age 內直接讀檔；錄製 / 重播時不用快取，每次都發請求。
+    """
+    path = CONFIG_CACHE_DIR / f"{urlsplit(base_url).netloc}.json"
+    use_cache = not fetch.client().capturing
+    if use_cache and path.exists():
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if datetime.now() - datetime.fromisoformat(cached["fetched_at"]) < max_age:
+            return cached["config"]
+    res = await _http_json(f"{base_url}/hixLocal/sysConfig/getHixConfig")
+    config = res.get("result", {}) if res.get("code") == 0 else {}
+    if use_cache and config:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps({"fetched_at": datetime.now().isoformat(timespec="seconds"),
+                                       "config": config}, ensure_ascii=False, indent=2))
+    return config
+
+
+async def fetch_schedule(base_url, date_from, date_to):
     """POST 取得 date_from~date_to 的班表 raw records。"""
-    res = _http_json(f"{base_url}/hixLocal/regSchedule/find",
-                     payload={"dateFrom": date_from, "dateTo": date_to, "flagType": "1"})
+    res = await _http_json(f"{base_url}/hixLocal/regSchedule/find",
+                           payload={"dateFrom": date_from, "dateTo": date_to, "flagType": "1"})
     if res.get("code") != 0:
         raise RuntimeError(f"regSchedule/find 回傳非 0：{res.get('code')} / {res.get('msg')}")
     return res.get("result", [])
@@ -125,10 +153,13 @@ def _session_from_record(rec, abbrev):
     }
 
 
-def build_sessions(clinic_id, date_from, date_to):
-    """抓取並轉成 sessions list（已套用排除規則）。"""
+async def build_sessions(clinic_id, date_from, date_to):
+    """抓取並轉成 sessions list（已套用排除規則）。抓取失敗丟 fetch.SourceError。"""
     cfg = HIXCARE_CLINICS[clinic_id]
-    records = fetch_schedule(cfg["base_url"], date_from, date_to)
+    try:
+        records = await fetch_schedule(cfg["base_url"], date_from, date_to)
+    except Exception as e:
+        raise fetch.SourceError(f"{clinic_id} hixcare 班表抓取失敗：{e}") from e
     exclude_rooms = set(cfg.get("exclude_rooms", []))
     sessions = []
     skipped = 0
@@ -151,6 +182,35 @@ def build_sessions(clinic_id, date_from, date_to):
     return sessions, skipped
 
 
+async def _build_with_config(clinic_id, date_from, date_to):
+    cfg = HIXCARE_CLINICS[clinic_id]
+
+    async def config():
+        # 設定只用來核對院所名稱：抓不到不影響班表
+        try:
+            return await get_hix_config(cfg["base_url"])
+        except Exception:
+            return {}
+
+    (sessions, skipped), hix_config = await asyncio.gather(
+        build_sessions(clinic_id, date_from, date_to), config())
+    return sessions, skipped, hix_config
+
+
+async def build_all(date_from, date_to, clinic_ids=None):
+    """
+    HIXCARE_CLINICS 全部（或指定的 clinic_ids）同時查詢，每家一個 regSchedule/find 涵蓋整個範圍。
+    回傳 {clinic_id: (sessions, skipped, hix_config) 或 fetch.SourceError}，順序同 HIXCARE_CLINICS。
+    """
+    ids = [c for c in HIXCARE_CLINICS if clinic_ids is None or c in clinic_ids]
+    results = await asyncio.gather(*(_build_with_config(c, date_from, date_to) for c in ids),
+                                   return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException) and not isinstance(r, fetch.SourceError):
+            raise r
+    return dict(zip(ids, results))
+
+
 def week_range(start_date, weeks):
     """回傳 (date_from, date_to)：start_date 所在週的週一 ~ 第 weeks 週的週日。"""
     monday = start_date - timedelta(days=start_date.weekday())
@@ -159,26 +219,59 @@ def week_range(start_date, weeks):
 
 
 def update_schedules_json(clinic_id, sessions, date_from, date_to):
-    """寫回 schedules.json：刪該診所 [date_from, date_to] 舊 sessions、補入新的。不可變寫法。"""
-    with open(SCHEDULES_JSON, encoding="utf-8") as f:
-        data = json.load(f)
-    kept = [s for s in data["sessions"]
-            if not (s["clinic_id"] == clinic_id and date_from <= s["date"] <= date_to)]
-    removed = len(data["sessions"]) - len(kept)
-    new_data = dict(
-        data,
-        sessions=kept + sessions,
-        meta=dict(data["meta"], generated_at=datetime.now().strftime("%Y-%m-%dT%H:%M:%S")),
-    )
-    with open(SCHEDULES_JSON, "w", encoding="utf-8") as f:
-        json.dump(new_data, f, ensure_ascii=False, indent=2)
+    """寫回 schedules.json：刪該診所 [date_from, date_to] 舊 sessions、補入新的。"""
+    txn = Transaction(SCHEDULES_JSON)
+    txn.replace(clinic_id, sessions, date_from, date_to)
+    removed, _ = txn.commit()[clinic_id]
+    print_conflicts(txn.store, txn.conflicts)
+    print_overlaps(txn.store, txn.overlaps)
     return removed
 
 
+def run_all(date_from, date_to, output=None, update=False):
+    """--all：全部診所同時查詢；寫回時一個 Transaction 一次寫完，失敗 / 0 筆的診所不寫回。"""
+    results = fetch.run(build_all(date_from, date_to))
+    ok, failed = {}, []
+    for clinic_id, result in results.items():
+        cfg = HIXCARE_CLINICS[clinic_id]
+        if isinstance(result, fetch.SourceError):
+            print(f"  ❌ {clinic_id} {cfg['name']}：{result}")
+            failed.append(clinic_id)
+            continue
+        sessions, skipped, hix_config = result
+        hospital = hix_config.get("HOSPITAL_NAME")
+        print(f"  {clinic_id} {cfg['name']}{f'（{hospital}）' if hospital else ''}："
+              f"{len(sessions)} 筆門診，跳過 {skipped} 筆")
+        if not sessions:
+            print(f"  ⚠️  {clinic_id} 抓到 0 筆，不寫回（保留既有 sessions）")
+            failed.append(clinic_id)
+            continue
+        ok[clinic_id] = sessions
+    print(f"  {fetch.client().stats_line()}")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump([s for ss in ok.values() for s in ss], f, ensure_ascii=False, indent=2)
+        print(f"已輸出 → {output}")
+
+    if update and ok:
+        txn = Transaction(SCHEDULES_JSON)
+        for clinic_id, sessions in ok.items():
+            txn.replace(clinic_id, sessions, date_from, date_to)
+        report = txn.commit()
+        print(f"✅ 已寫回 schedules.json（總 sessions {txn.total}）")
+        print_report(report)
+        print_conflicts(txn.store, txn.conflicts)
+        print_overlaps(txn.store, txn.overlaps)
+    if failed:
+        raise SystemExit(f"⚠️  未寫回：{', '.join(failed)}（既有 sessions 不動）")
+
+
 def main():
     ap = argparse.ArgumentParser(description="hixcare 班表爬蟲")
-    ap.add_argument("--clinic", required=True, choices=sorted(HIXCARE_CLINICS),
-                    help="診所代碼，例 c03")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--clinic", choices=sorted(HIXCARE_CLINICS), help="診所代碼，例 c03")
+    target.add_argument("--all", action="store_true", help="HIXCARE_CLINICS 全部同時查詢、一次寫回")
     ap.add_argument("--weeks", type=int, default=1, help="從起始週起算幾週（預設 1=本週）")
     ap.add_argument("--start-date", help="起始日 YYYY-MM-DD（預設今天）")
     ap.add_argument("--date-from", help="明確起日 YYYY-MM-DD（覆寫 weeks/start-date）")
@@ -186,7 +279,9 @@ def main():
     ap.add_argument("--output", help="輸出 sessions JSON 到檔案")
     ap.add_argument("--update-schedules", action="store_true",
                     help="直接寫回 schedules.json")
+    fetch.add_capture_arguments(ap)
     args = ap.parse_args()
+    fetch.configure(args)
 
     if args.date_from and args.date_to:
         date_from, date_to = args.date_from, args.date_to
@@ -194,10 +289,18 @@ def main():
         start = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else datetime.now()
         date_from, date_to = week_range(start, args.weeks)
 
+    if args.all:
+        print(f"hixcare 全部 {len(HIXCARE_CLINICS)} 家　範圍：{date_from} ~ {date_to}")
+        run_all(date_from, date_to, args.output, args.update_schedules)
+        return
+
     cfg = HIXCARE_CLINICS[args.clinic]
     print(f"診所：{args.clinic} {cfg['name']}　範圍：{date_from} ~ {date_to}")
 
-    sessions, skipped = build_sessions(args.clinic, date_from, date_to)
+    try:
+        sessions, skipped = fetch.run(build_sessions(args.clinic, date_from, date_to))
+    except fetch.SourceError as e:
+        raise SystemExit(f"❌ {e}（未寫回，保留既有 sessions）")
     by_date = {}
     for s in sessions:
         by_date.setdefault(s["date"], []).append(s)
@@ -211,6 +314,9 @@ def main():
             json.dump(sessions, f, ensure_ascii=False, indent=2)
         print(f"已輸出 → {args.output}")
 
+    if args.update_schedules and not sessions:
+        # 整個範圍 0 筆幾乎都是來源異常：不拿空資料刪掉既有的 sessions
+        raise SystemExit("❌ 抓到 0 筆門診，不寫回（保留既有 sessions）")
     if args.update_schedules:
         removed = update_schedules_json(args.clinic, sessions, date_from, date_to)
         print(f"✅ 已寫回 schedules.json（刪舊 {removed} / 新增 {len(sessions)}）")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+HTTP 條件式請求 + 內容雜湊快取 — 來源沒變就不重新解析 / 寫回
+
+CXMS hosp.php、新店高美 hours.asp、C3 固定班表網站（維力、祥明）很少改版，
+但每次都整頁重抓、重新解析。本模組在 scraper/cache/http/ 為每個 URL 存：
+  {key}.json   {"url", "etag", "last_modified", "sha256", "fetched_at", "processed"}
+  {key}.body   上次抓到的原始 body
+
+HTTPCache.get(url)：
+  - 有快取時送 If-None-Match / If-Modified-Since；回 304 直接用快取 body
+  - 否則比對 body 的 sha256；和上次相同時 resp.unchanged = True
+  - 每個 URL 的結果（new / changed / unchanged）記在 cache.results，report() 印出摘要
+
+「跳過解析與寫回」以 processed 為準：呼叫端寫回成功後 mark_processed(resp, date_from, date_to)，
+下次 processed(resp, date_from, date_to) 在 body 相同且上次寫回範圍涵蓋本次範圍時回 True。
+只抓不寫（沒有 --update-schedules）不會標記，下次照常處理。
+
+用法：
+  # C3 固定班表網站有無變動；有變動的存一份快照（snapshot_store，meta 在 snapshots/web/{clinic_id}/）
+  python3 scraper/httpcache.py --c3
+
+  # 任意 URL
+  python3 scraper/httpcache.py https://www.shiangming.com/time.php
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import fetch
+import snapshot_store
+from store import atomic_write, atomic_write_bytes
+
+SCRAPER_DIR = Path(__file__).resolve().parent
+CACHE_DIR = SCRAPER_DIR / "cache" / "http"
+SNAPSHOT_DIR = SCRAPER_DIR / "snapshots" / "web"
+
+
+class HTTPCache:
+    def __init__(self, directory: Path = CACHE_DIR, client: fetch.Client = None):
+        self.directory = Path(directory)
+        self.client = client
+        self.results = {}          # url → "new" / "changed" / "unchanged"
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+    def _paths(self, url: str) -> tuple:
+        key = self._key(url)
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def entry(self, url: str) -> dict:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_entry(self, url: str, entry: dict) -> None:
+        meta_path, _ = self._paths(url)
+        atomic_write(meta_path, json.dumps(entry, ensure_ascii=False, indent=2))
+
+    async def get(self, url: str, **kwargs) -> fetch.Response:
+        """
+        條件式 GET。回傳的 Response 一律帶完整 body（304 時取自快取），
+        resp.unchanged 表示 body 與上次抓到的相同；resp.cache_url 為請求的 url（轉址後 resp.url 會不同）。
+        """
+        client = self.client or fetch.client()
+        if client.capturing:
+            # 錄製 / 重播：不讀寫快取，每次都當成新內容，結果只取決於錄製檔
+            resp = await client.get(url, **kwargs)
+            resp.cache_url = None
+            self.results[url] = "new"
+            return resp
+        entry = self.entry(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = await client.get(url, headers=headers, **kwargs)
+
+        _, body_path = self._paths(url)
+        if resp.status == 304 and entry:
+            resp = fetch.Response(resp.url, 200, {**resp.headers, "x-cache": "304"},
+                                  body_path.read_bytes())
+        digest = hashlib.sha256(resp.body).hexdigest()
+        resp.unchanged = bool(entry) and entry.get("sha256") == digest
+        resp.cache_url = url
+        self.results[url] = "unchanged" if resp.unchanged else ("changed" if entry else "new")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not resp.unchanged:
+            atomic_write_bytes(body_path, resp.body)
+        self._save_entry(url, {
+            "url": url,
+            "etag": resp.headers.get("etag") or (entry or {}).get("etag"),
+            "last_modified": resp.headers.get("last-modified") or (entry or {}).get("last_modified"),
+            "sha256": digest,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "processed": (entry or {}).get("processed"),
+        })
+        return resp
+
+    def processed(self, resp: fetch.Response, date_from: str = None, date_to: str = None) -> bool:
+        """這份 body 是否已經處理（寫回）過，且當時的日期範圍涵蓋 [date_from, date_to]。"""
+        if resp.cache_url is None:
+            return False
+        done = (self.entry(resp.cache_url) or {}).get("processed")
+        if not done or done["sha256"] != hashlib.sha256(resp.body).hexdigest():
+            return False
+        if date_from and (not done.get("date_from") or done["date_from"] > date_from):
+            return False
+        if date_to and (not done.get("date_to") or done["date_to"] < date_to):
+            return False
+        return True
+
+    def mark_processed(self, resp: fetch.Response, date_from: str = None, date_to: str = None) -> None:
+        """呼叫端寫回成功後標記；下次同一份 body、範圍被涵蓋時 processed() 回 True。"""
+        entry = self.entry(resp.cache_url) if resp.cache_url else None
+        if entry is None:
+            return
+        entry["processed"] = {"sha256": hashlib.sha256(resp.body).hexdigest(),
+                              "date_from": date_from, "date_to": date_to}
+        self._save_entry(resp.cache_url, entry)
+
+    def report(self) -> list:
+        """['未變動：url', '有更新：url', ...]，供各爬蟲結尾列印。"""
+        labels = {"unchanged": "未變動", "changed": "有更新", "new": "首次抓取"}
+        return [f"{labels[r]}：{u}" for u, r in sorted(self.results.items(), key=lambda x: x[1] != "unchanged")]
+
+
+def c3_sources() -> dict:
+    """schedule_type C3 的診所，依 source_url 分組：url → [clinic_id]（維力兩院共用一頁）。"""
+    from store import SCHEDULES_JSON, load_clinics
+
+    sources = {}
+    for c in load_clinics(SCHEDULES_JSON):
+        if c.get("schedule_type") == "C3" and c.get("source_url", "").startswith("http"):
+            sources.setdefault(c["source_url"], []).append(c["id"])
+    return sources
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HTTP 條件式請求 + 內容雜湊快取")
+    ap.add_argument("urls", nargs="*", help="要檢查的 URL")
+    ap.add_argument("--c3", action="store_true",
+                    help="檢查 C3 固定班表網站，有變動的存快照（meta 在 snapshots/web/{clinic_id}/）")
+    fetch.add_capture_arguments(ap)
+    args = ap.parse_args()
+    fetch.configure(args)
+
+    sources = {u: [] for u in args.urls}
+    if args.c3:
+        sources.update(c3_sources())
+    if not sources:
+        ap.error("請指定 URL 或 --c3")
+
+    cache = HTTPCache()
+
+    async def check(url, clinic_ids):
+        try:
+            resp = await cache.get(url, headers={"Accept": fetch.HTML_ACCEPT})
+        except Exception as e:
+            print(f"  ❌ {url}：{e}")
+            return
+        if cache.processed(resp):
+            print(f"  ⏭️  未變動 {url}")
+            return
+        print(f"  🆕 {url}（{len(resp.body):,} bytes）")
+        date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for clinic_id in clinic_ids:
+            meta = snapshot_store.save(SNAPSHOT_DIR / clinic_id, date_str, {
+                "clinic_id": clinic_id,
+                "url": url,
+                "scraped_at": datetime.now().isoformat(),
+                "html_size_bytes": len(resp.body),
+                "status": "success",
+            }, resp.body, ".html")
+            print(f"     → {meta['html_file']}")
+        cache.mark_processed(resp)
+
+    async def check_all():
+        await asyncio.gather(*(check(u, ids) for u, ids in sources.items()))
+
+    fetch.run(check_all())
+    unchanged = sum(1 for r in cache.results.values() if r == "unchanged")
+    print(f"共 {len(sources)} 個來源，{unchanged} 個未變動")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,17 +9,24 @@
   - header row 包含 MON..SUN
   - slot rows 第一欄為 上午 / 下午 / 晚上
   - 第二欄為時間，後七欄為週一至週日醫師
+
+官網經 httpcache 條件式請求抓取：頁面與上次寫回時相同、且上次寫回範圍涵蓋本次範圍時，
+略過解析與寫回（--force 強制重跑）。
+--record DIR / --replay DIR 錄下 / 離線重播官網回應（見 fetch.py）；--input 則直接讀本機 HTML。
 """
 
 import argparse
 import calendar
 import json
 import re
-import urllib.request
 from datetime import date, datetime, timedelta
 from html.parser import HTMLParser
 from pathlib import Path
 
+import fetch
+from httpcache import HTTPCache
+from store import Transaction, print_conflicts, print_overlaps
+
 
 CLINIC_ID = "c26"
 CLINIC_NAME = "新店高美泌尿科"
@@ -72,19 +79,8 @@ class TableParser(HTMLParser):
             self._table = None
 
 
-def fetch_html(url: str = SOURCE_URL) -> str:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121 Safari/537.36"
-            )
-        },
-    )
-    with urllib.request.urlopen(req, timeout=20) as resp:
-        charset = resp.headers.get_content_charset() or "utf-8"
-        return resp.read().decode(charset, errors="replace")
+async def fetch_page(cache: HTTPCache, url: str = SOURCE_URL) -> fetch.Response:
+    return await cache.get(url, timeout=20)
 
 
 def find_schedule_table(html: str) -> list[list[str]]:
@@ -193,45 +189,34 @@ def generate_sessions(weekly: list[dict], start: date, end: date) -> list[dict]:
     return sessions
 
 
-def load_or_fetch_html(args) -> str:
+def load_or_fetch_html(args, cache: HTTPCache) -> tuple:
+    """回傳 (html, resp)；--input 時 resp 為 None。"""
     if args.input:
-        return Path(args.input).read_text(encoding="utf-8", errors="replace")
-    return fetch_html()
+        return Path(args.input).read_text(encoding="utf-8", errors="replace"), None
+    resp = fetch.run(fetch_page(cache))
+    return resp.text(), resp
 
 
 def update_schedules(sessions: list[dict], start: date, end: date) -> None:
-    with SCHEDULES_JSON.open(encoding="utf-8") as f:
-        data = json.load(f)
-
-    if not any(c["id"] == CLINIC_ID for c in data["clinics"]):
-        data["clinics"].append(
-            {
-                "id": CLINIC_ID,
-                "name": CLINIC_NAME,
-                "aliases": ["新店高美"],
-                "color": "#16a085",
-                "source_url": SOURCE_URL,
-                "schedule_type": "C1",
-                "whitelist": [],
-                "blacklist": [],
-            }
-        )
-
-    before = len(data["sessions"])
-    data["sessions"] = [
-        s
-        for s in data["sessions"]
-        if not (s.get("clinic_id") == CLINIC_ID and start.isoformat() <= s.get("date", "") <= end.isoformat())
-    ]
-    removed = before - len(data["sessions"])
-    data["sessions"].extend(sessions)
-    data["meta"]["generated_at"] = datetime.now().isoformat(timespec="seconds")
-
-    with SCHEDULES_JSON.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-
-    print(f"updated schedules.json: removed={removed} added={len(sessions)} total={len(data['sessions'])}")
+    txn = Transaction(SCHEDULES_JSON)
+    txn.ensure_clinic(
+        {
+            "id": CLINIC_ID,
+            "name": CLINIC_NAME,
+            "aliases": ["新店高美"],
+            "color": "#16a085",
+            "source_url": SOURCE_URL,
+            "schedule_type": "C1",
+            "whitelist": [],
+            "blacklist": [],
+        }
+    )
+    txn.replace(CLINIC_ID, sessions, start.isoformat(), end.isoformat())
+    removed, added = txn.commit()[CLINIC_ID]
+
+    print(f"updated schedules.json: removed={removed} added={added} total={txn.total}")
+    print_conflicts(txn.store, txn.conflicts)
+    print_overlaps(txn.store, txn.overlaps)
 
 
 def main():
@@ -243,14 +228,22 @@ def main():
     parser.add_argument("--output", help="輸出 sessions JSON")
     parser.add_argument("--update-schedules", action="store_true", help="寫入 schedules.json")
     parser.add_argument("--print-weekly", action="store_true", help="列印解析出的週班表")
+    parser.add_argument("--force", action="store_true", help="官網未變動也重新解析 / 寫回")
+    fetch.add_capture_arguments(parser)
     args = parser.parse_args()
+    fetch.configure(args)
 
     start = datetime.strptime(args.start_date, "%Y-%m-%d").date()
     end = datetime.strptime(args.end_date, "%Y-%m-%d").date() if args.end_date else month_end(start, args.months)
     if end < start:
         raise SystemExit("--end-date 不可早於 --start-date")
 
-    html = load_or_fetch_html(args)
+    cache = HTTPCache()
+    html, resp = load_or_fetch_html(args, cache)
+    if (resp is not None and not (args.force or args.output or args.print_weekly)
+            and cache.processed(resp, start.isoformat(), end.isoformat())):
+        print(f"unchanged {SOURCE_URL}: 與上次寫回相同，略過解析與寫回（--force 強制重跑）")
+        return
     weekly = parse_weekly_schedule(html)
     sessions = generate_sessions(weekly, start, end)
 
@@ -267,6 +260,8 @@ def main():
 
     if args.update_schedules:
         update_schedules(sessions, start, end)
+        if resp is not None:
+            cache.mark_processed(resp, start.isoformat(), end.isoformat())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+過期 sessions 封存 — schedules.json 只留最近一週 + 未來
+
+UI 預設只看今天起的日期，但 schedules.json 從 2026-02 一路累積。
+本腳本把早於「今天 - keep_days」的 sessions 移到 archive/sessions/{YYYY-MM}.json（每月一檔），
+live 檔只保留最近 keep_days 天與未來的 sessions。
+
+封存檔格式：{"month": "2026-02", "sessions": [...]}，session 格式同 schedules.json。
+重複封存同一筆（以 id + date 判斷）會以新內容覆蓋，不會重複；中途中斷重跑結果相同。
+
+封存後仍可查：
+  - 程式內：load_archived(date_from, date_to) / with_archive(sessions)
+  - store.py --conflicts --with-archive、delta.py --with-archive 會把封存資料一併納入
+
+用法：
+  # 預覽會封存哪些月份 / 筆數（不寫檔）
+  python3 scraper/retention.py --dry-run
+
+  # 封存 7 天前的 sessions（預設）
+  python3 scraper/retention.py
+
+  # 自訂保留天數
+  python3 scraper/retention.py --keep-days 14
+
+  # 查詢封存 + live 的 sessions
+  python3 scraper/retention.py --query --date-from 2026-03-01 --date-to 2026-03-07 --clinic c02
+"""
+
+import argparse
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+from store import SCHEDULES_JSON, ScheduleStore, atomic_write, locked_store
+
+ARCHIVE_SUBDIR = Path("archive") / "sessions"
+DEFAULT_KEEP_DAYS = 7
+
+
+def archive_dir(schedules_path: Path = SCHEDULES_JSON) -> Path:
+    return Path(schedules_path).parent / ARCHIVE_SUBDIR
+
+
+def _month_path(month: str, schedules_path: Path) -> Path:
+    return archive_dir(schedules_path) / f"{month}.json"
+
+
+def archive_months(schedules_path: Path = SCHEDULES_JSON) -> list:
+    """已有封存檔的月份（'YYYY-MM'，已排序）。"""
+    d = archive_dir(schedules_path)
+    return sorted(p.stem for p in d.glob("*.json")) if d.exists() else []
+
+
+def _read_month(month: str, schedules_path: Path) -> list:
+    path = _month_path(month, schedules_path)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["sessions"]
+
+
+def load_archived(date_from: str = None, date_to: str = None,
+                  schedules_path: Path = SCHEDULES_JSON) -> list:
+    """讀封存的 sessions；只開與 [date_from, date_to] 重疊的月份檔。"""
+    out = []
+    for month in archive_months(schedules_path):
+        if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+            continue
+        out.extend(s for s in _read_month(month, schedules_path)
+                   if (not date_from or s["date"] >= date_from) and (not date_to or s["date"] <= date_to))
+    return out
+
+
+def _key(session: dict) -> tuple:
+    """封存去重用的鍵：id 的 MMDD 不含年份、部分 id 沒有日期，單看 id 會跨年相撞。"""
+    return session["id"], session["date"]
+
+
+def with_archive(sessions: list, schedules_path: Path = SCHEDULES_JSON,
+                 date_from: str = None, date_to: str = None) -> list:
+    """
+    封存 sessions（只讀 [date_from, date_to]）+ live sessions，供分析 / 差異工具使用。
+    同 id 同日期以 live 為準；同 id 不同日期（例如去年同日）兩筆都保留。
+    """
+    live_keys = {_key(s) for s in sessions}
+    archived = [s for s in load_archived(date_from, date_to, schedules_path) if _key(s) not in live_keys]
+    return archived + list(sessions)
+
+
+def _merge_month(month: str, sessions: list, schedules_path: Path) -> int:
+    """把 sessions 併入該月封存檔（同 id 同日期覆蓋），依 date、id 排序後原子寫入。回傳封存檔總筆數。"""
+    merged = {_key(s): s for s in _read_month(month, schedules_path)}
+    merged.update((_key(s), s) for s in sessions)
+    rows = sorted(merged.values(), key=lambda s: (s["date"], s["id"]))
+    path = _month_path(month, schedules_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, json.dumps({"month": month, "sessions": rows}, ensure_ascii=False, indent=2) + "\n")
+    return len(rows)
+
+
+def cutoff_date(keep_days: int = DEFAULT_KEEP_DAYS, today: date = None) -> str:
+    """早於此日期（不含）的 sessions 會被封存。"""
+    return ((today or date.today()) - timedelta(days=keep_days)).isoformat()
+
+
+def expired_by_month(store: ScheduleStore, cutoff: str) -> dict:
+    """'YYYY-MM' → 早於 cutoff 的 sessions。"""
+    by_month = {}
+    last_day = (date.fromisoformat(cutoff) - timedelta(days=1)).isoformat()
+    for c in {s["clinic_id"] for s in store.sessions()}:
+        for s in store.sessions_for(c, None, last_day):
+            by_month.setdefault(s["date"][:7], []).append(s)
+    return by_month
+
+
+def archive(keep_days: int = DEFAULT_KEEP_DAYS, today: date = None,
+            schedules_path: Path = SCHEDULES_JSON) -> dict:
+    """封存過期 sessions 並寫回 live 檔，回傳 {'YYYY-MM': 本次封存筆數}。"""
+    cutoff = cutoff_date(keep_days, today)
+    last_day = (date.fromisoformat(cutoff) - timedelta(days=1)).isoformat()
+    with locked_store(schedules_path) as store:
+        by_month = expired_by_month(store, cutoff)
+        # 先寫封存檔再從 live 刪：中途中斷時資料至少還在其中一邊
+        for month, sessions in sorted(by_month.items()):
+            _merge_month(month, sessions, schedules_path)
+        for clinic_id in {s["clinic_id"] for ss in by_month.values() for s in ss}:
+            store.remove_range(clinic_id, None, last_day)
+    return {month: len(ss) for month, ss in sorted(by_month.items())}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="過期 sessions 封存")
+    ap.add_argument("--keep-days", type=int, default=DEFAULT_KEEP_DAYS,
+                    help=f"live 檔保留今天往前幾天（預設 {DEFAULT_KEEP_DAYS}）")
+    ap.add_argument("--today", help="以指定日期為今天 YYYY-MM-DD（預設今天）")
+    ap.add_argument("--dry-run", action="store_true", help="只列出會封存的月份與筆數")
+    ap.add_argument("--query", action="store_true", help="查詢封存 + live 的 sessions")
+    ap.add_argument("--date-from", help="--query 起日")
+    ap.add_argument("--date-to", help="--query 迄日")
+    ap.add_argument("--clinic", help="--query 診所 ID")
+    args = ap.parse_args()
+
+    today = date.fromisoformat(args.today) if args.today else None
+
+    if args.query:
+        store = ScheduleStore.load()
+        live = [s for s in store.sessions()
+                if (not args.date_from or s["date"] >= args.date_from)
+                and (not args.date_to or s["date"] <= args.date_to)]
+        rows = with_archive(live, date_from=args.date_from, date_to=args.date_to)
+        rows = [s for s in rows if not args.clinic or s["clinic_id"] == args.clinic]
+        for s in sorted(rows, key=lambda x: (x["date"], x["clinic_id"], x["id"])):
+            print(f"  {s['date']} {s['clinic_id']} {s['slot']:<9} {s['doctor_name']:<6} {s['id']}")
+        print(f"共 {len(rows)} 筆")
+        return
+
+    cutoff = cutoff_date(args.keep_days, today)
+    if args.dry_run:
+        by_month = expired_by_month(ScheduleStore.load(), cutoff)
+        print(f"封存 {cutoff} 以前的 sessions（預覽）")
+        for month, ss in sorted(by_month.items()):
+            print(f"  {month}：{len(ss)} 筆")
+        print(f"共 {sum(len(ss) for ss in by_month.values())} 筆")
+        return
+
+    moved = archive(args.keep_days, today)
+    print(f"✅ 已封存 {cutoff} 以前的 sessions → {archive_dir()}")
+    for month, n in moved.items():
+        print(f"  {month}：{n} 筆")
+    print(f"共 {sum(moved.values())} 筆")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+舊快照封存 — snapshots/ 只留最近 N 週，更早的壓縮成每診所每月一個 zip
+
+snapshots/{web,social,image}/ 下的 meta JSON 與 HTML 會一直累積。本腳本對每個診所目錄：
+  - 最新一份 meta 永遠留在 live（show_status、mark_transcribed 都看它）
+  - 早於「今天 - N 週」的 meta：
+      changed 為 false 且未轉錄的（內容與前一份相同）直接刪掉，只留變動點
+      其餘（變動點、轉錄過的、舊格式沒有 sha256 的）收進 zip
+  - 早於 N 週、檔名以 YYYYMMDD 開頭的舊格式 HTML / JSON / 文字檔也收進 zip
+  - 收進 zip 的 meta 指向的 objects，若已沒有 live meta 指向，一併移進 zip
+
+zip 路徑：snapshots/archive/{web|social|image}/{診所目錄}/{YYYY-MM}.zip，
+成員名稱為相對 snapshots/ 的原路徑；HTML / JSON 以 deflate 壓縮，圖片原樣存入。
+snapshots/archive/index.json 記「原路徑 → zip」，snapshot_store.read() / exists() / history()
+據此直接讀單一成員，不必整包解開。
+
+先寫 zip（暫存檔 + rename）、再寫 index、最後才刪 live 檔；中途中斷重跑結果相同。
+
+用法：
+  # 預覽（不寫檔）
+  python3 scraper/snapshot_archive.py --dry-run
+
+  # 封存 8 週以前的快照（預設）
+  python3 scraper/snapshot_archive.py
+
+  # 自訂保留週數
+  python3 scraper/snapshot_archive.py --keep-weeks 12
+
+  # 封存後查詢 / 取出
+  python3 scraper/snapshot_store.py --history web/c02
+  python3 scraper/snapshot_store.py --cat web/c02/20260301_120000_meta.json
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import snapshot_store
+from store import atomic_write
+
+DEFAULT_KEEP_WEEKS = 8
+KINDS = ("web", "social", "image")
+ARCHIVE_SUFFIXES = {".html", ".htm", ".json", ".txt", ".md"}   # 舊格式直接存檔的文字類
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}   # 已壓縮，不再 deflate
+DATED = re.compile(r"(\d{4})(\d{2})(\d{2})_")
+
+
+def cutoff_date(keep_weeks: int = DEFAULT_KEEP_WEEKS, today: date = None) -> str:
+    """檔名日期早於此日（YYYYMMDD，不含）的快照會被封存。"""
+    return ((today or date.today()) - timedelta(weeks=keep_weeks)).strftime("%Y%m%d")
+
+
+def clinic_dirs() -> list:
+    out = []
+    for kind in KINDS:
+        d = snapshot_store.SNAPSHOTS_DIR / kind
+        if d.exists():
+            out.extend(sorted(p for p in d.iterdir() if p.is_dir()))
+    return out
+
+
+def _month(name: str) -> str:
+    m = DATED.match(name)
+    return f"{m.group(1)}-{m.group(2)}"
+
+
+def plan_clinic(clinic_dir: Path, cutoff: str) -> dict:
+    """
+    單一診所目錄的封存計畫：
+      {"archive": {'YYYY-MM': [相對路徑]}, "drop": [相對路徑], "objects": {object: 'YYYY-MM'}}
+    objects 為封存 / 刪除的 meta 所指向的內容，是否真的移走由 plan() 看全域引用決定。
+    """
+    metas = snapshot_store.meta_files(clinic_dir)       # 新的在前
+    latest = metas[0] if metas else None
+    latest_meta = json.loads(latest.read_text(encoding="utf-8")) if latest else {}
+    keep_live = {snapshot_store.relative(latest)} if latest else set()
+    for key in ("html_file", "screenshot_file"):
+        # 舊格式的最新 meta 直接指向目錄裡的檔案，那個檔案也要留著
+        if not latest_meta.get("object") and latest_meta.get(key):
+            keep_live.add(snapshot_store.relative(latest_meta[key]))
+
+    result = {"archive": {}, "drop": [], "objects": {}}
+    for path in sorted(clinic_dir.iterdir()):
+        rel = snapshot_store.relative(path)
+        if not path.is_file() or not DATED.match(path.name) or rel in keep_live:
+            continue
+        if path.name[:8] >= cutoff:
+            continue
+        month = _month(path.name)
+        if path.name.endswith("_meta.json"):
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            if meta.get("object"):
+                result["objects"].setdefault(meta["object"], month)
+            if meta.get("changed") is False and not meta.get("transcribed"):
+                result["drop"].append(rel)
+                continue
+        elif path.suffix.lower() not in ARCHIVE_SUFFIXES:
+            continue
+        result["archive"].setdefault(month, []).append(rel)
+    return result
+
+
+def plan(cutoff: str) -> dict:
+    """
+    全部診所的封存計畫：{zip 相對路徑: [成員相對路徑]}、要刪的 meta、要移走的 objects。
+    object 只要還有 live meta（不在本次封存 / 刪除之列）指向就留在 objects/。
+    """
+    zips, drop, moving = {}, [], {}
+    for clinic_dir in clinic_dirs():
+        p = plan_clinic(clinic_dir, cutoff)
+        prefix = f"archive/{snapshot_store.relative(clinic_dir)}"
+        for month, rels in p["archive"].items():
+            zips.setdefault(f"{prefix}/{month}.zip", []).extend(rels)
+        drop.extend(p["drop"])
+        for obj, month in p["objects"].items():
+            moving.setdefault(obj, f"{prefix}/{month}.zip")
+
+    leaving = set(drop) | {rel for rels in zips.values() for rel in rels}
+    live_refs = set()
+    for meta_path in snapshot_store.SNAPSHOTS_DIR.glob("*/*/*_meta.json"):
+        if snapshot_store.relative(meta_path) not in leaving:
+            obj = json.loads(meta_path.read_text(encoding="utf-8")).get("object")
+            if obj:
+                live_refs.add(obj)
+    for obj, zip_rel in moving.items():
+        if obj not in live_refs and (snapshot_store.SNAPSHOTS_DIR / obj).exists():
+            zips.setdefault(zip_rel, []).append(obj)
+    return {"zips": zips, "drop": drop}
+
+
+def _write_zip(zip_path: Path, rels: list) -> None:
+    """把 rels 加進 zip（已有的成員略過）；在暫存檔上寫完、檢查過才 rename。"""
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=zip_path.parent, prefix=f".{zip_path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if zip_path.exists():
+            shutil.copyfile(zip_path, tmp)
+        with zipfile.ZipFile(tmp, "a") as zf:
+            existing = set(zf.namelist())
+            for rel in rels:
+                if rel in existing:
+                    continue
+                compress = (zipfile.ZIP_STORED if Path(rel).suffix.lower() in STORED_SUFFIXES
+                            else zipfile.ZIP_DEFLATED)
+                zf.write(snapshot_store.SNAPSHOTS_DIR / rel, rel, compress_type=compress)
+        with zipfile.ZipFile(tmp) as zf:
+            bad = zf.testzip()
+            if bad:
+                raise zipfile.BadZipFile(f"{zip_path} 成員 {bad} CRC 不符")
+        os.replace(tmp, zip_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def archive(keep_weeks: int = DEFAULT_KEEP_WEEKS, today: date = None) -> dict:
+    """封存舊快照，回傳 {"zips": {zip: 成員數}, "dropped": 刪掉的 meta 數, "bytes": 釋出的 live bytes}。"""
+    p = plan(cutoff_date(keep_weeks, today))
+    index = snapshot_store.archive_index()
+    freed = 0
+    # 先寫 zip 與 index 再刪 live 檔：中途中斷時資料至少還在其中一邊
+    for zip_rel, rels in sorted(p["zips"].items()):
+        _write_zip(snapshot_store.SNAPSHOTS_DIR / zip_rel, rels)
+        index.update((rel, zip_rel) for rel in rels)
+    if p["zips"]:
+        index_path = snapshot_store.archive_dir() / "index.json"
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(index_path, json.dumps(dict(sorted(index.items())), ensure_ascii=False, indent=2))
+    for rel in [r for rels in p["zips"].values() for r in rels] + p["drop"]:
+        path = snapshot_store.SNAPSHOTS_DIR / rel
+        if path.exists():
+            freed += path.stat().st_size
+            path.unlink()
+    return {"zips": {z: len(r) for z, r in sorted(p["zips"].items())},
+            "dropped": len(p["drop"]), "bytes": freed}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="舊快照封存")
+    ap.add_argument("--keep-weeks", type=int, default=DEFAULT_KEEP_WEEKS,
+                    help=f"live 保留最近幾週（預設 {DEFAULT_KEEP_WEEKS}）")
+    ap.add_argument("--today", help="以指定日期為今天 YYYY-MM-DD（預設今天）")
+    ap.add_argument("--dry-run", action="store_true", help="只列出會封存 / 刪除的檔案數")
+    args = ap.parse_args()
+
+    today = date.fromisoformat(args.today) if args.today else None
+    cutoff = cutoff_date(args.keep_weeks, today)
+
+    if args.dry_run:
+        p = plan(cutoff)
+        print(f"封存 {cutoff} 以前的快照（預覽）")
+        for zip_rel, rels in sorted(p["zips"].items()):
+            print(f"  {zip_rel}：{len(rels)} 個檔案")
+        print(f"未變動、直接刪除的 meta：{len(p['drop'])} 個")
+        return
+
+    result = archive(args.keep_weeks, today)
+    print(f"✅ 已封存 {cutoff} 以前的快照 → {snapshot_store.archive_dir()}")
+    for zip_rel, n in result["zips"].items():
+        print(f"  {zip_rel}：{n} 個檔案")
+    print(f"未變動、直接刪除的 meta：{result['dropped']} 個；live 釋出 {result['bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
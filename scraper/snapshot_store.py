@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+快照內容定址儲存 — 同樣的 HTML / 截圖只存一份
+
+web_validator、httpcache --c3、fb_snapshot 每次執行都會留一份快照，但週與週之間
+大多一個 byte 都沒變。實際內容改存在 snapshots/objects/ 下、以 sha256 命名：
+  snapshots/objects/{sha256 前 2 碼}/{sha256}{副檔名}
+
+各診所目錄只留每次執行的 meta JSON（{date}_meta.json），指向內容：
+  "sha256":  內容雜湊
+  "object":  相對 snapshots/ 的路徑，例如 objects/3f/3fa4…e1.html
+  "changed": 與該目錄上一份 meta 的 sha256 是否不同
+原本的 html_file / screenshot_file 欄位仍保留，值同 object（相對 snapshots/，repo 搬移或重新 clone 後仍有效）。
+
+相同內容再存一次只多一個 meta JSON；「有沒有變」就是比對 sha256。
+
+舊快照由 snapshot_archive.py 收進 snapshots/archive/ 的月份 zip；archive/index.json 記
+「相對 snapshots/ 的路徑 → zip」。read() / exists() / history() 先找 live 檔，
+找不到再查 index 從 zip 讀單一成員，不必整包解開。
+
+用法：
+  python3 scraper/snapshot_store.py            # objects 數量、大小與引用它們的 meta 數
+  python3 scraper/snapshot_store.py --orphans  # 列出沒有任何 meta 指向的 objects
+  python3 scraper/snapshot_store.py --history web/c02           # live + 封存的所有快照
+  python3 scraper/snapshot_store.py --cat web/c02/20260301_120000_meta.json --out /tmp/x
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+from store import atomic_write, atomic_write_bytes
+
+SCRAPER_DIR = Path(__file__).resolve().parent
+SNAPSHOTS_DIR = SCRAPER_DIR / "snapshots"
+OBJECTS_DIR = SNAPSHOTS_DIR / "objects"
+
+
+def object_path(digest: str, suffix: str = "") -> Path:
+    return OBJECTS_DIR / digest[:2] / f"{digest}{suffix}"
+
+
+def put(data: bytes, suffix: str = "") -> tuple:
+    """存入 objects（已存在就不寫），回傳 (sha256, 路徑)。"""
+    digest = hashlib.sha256(data).hexdigest()
+    path = object_path(digest, suffix)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, data)
+    return digest, path
+
+
+def meta_files(clinic_dir: Path) -> list:
+    """診所目錄下的 meta JSON，新的在前（檔名以 YYYYMMDD_HHMMSS 開頭）。"""
+    return sorted(Path(clinic_dir).glob("*_meta.json"), reverse=True)
+
+
+def latest_meta(clinic_dir: Path) -> dict:
+    """最新一份帶 sha256 的 meta；沒有時回 None。"""
+    for path in meta_files(clinic_dir):
+        meta = json.loads(path.read_text(encoding="utf-8"))
+        if meta.get("sha256"):
+            return meta
+    return None
+
+
+def archive_dir() -> Path:
+    return SNAPSHOTS_DIR / "archive"
+
+
+def archive_index() -> dict:
+    """封存 lookup：相對 snapshots/ 的路徑 → 所在 zip（相對 snapshots/）。"""
+    path = archive_dir() / "index.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def relative(path) -> str:
+    """
+    路徑 → 相對 snapshots/ 的 posix 路徑。新格式 meta 本來就存相對 snapshots/ 的路徑；
+    舊格式存的是絕對路徑，repo 搬移過就取最後一個 snapshots/ 之後的部分。
+    絕對路徑且不在任何 snapshots/ 下時回 None。
+    """
+    p = Path(path)
+    try:
+        return p.resolve().relative_to(SNAPSHOTS_DIR.resolve()).as_posix()
+    except ValueError:
+        pass
+    if SNAPSHOTS_DIR.name in p.parts:
+        parts = p.parts[len(p.parts) - p.parts[::-1].index(SNAPSHOTS_DIR.name):]
+        return Path(*parts).as_posix()
+    return None if p.is_absolute() else p.as_posix()
+
+
+def read(rel: str, index: dict = None) -> bytes:
+    """讀 snapshots/ 下的檔案；已封存的從 zip 讀出該成員。都沒有時回 None。"""
+    live = SNAPSHOTS_DIR / rel
+    if live.exists():
+        return live.read_bytes()
+    zip_rel = (archive_index() if index is None else index).get(rel)
+    if zip_rel is None:
+        return None
+    with zipfile.ZipFile(SNAPSHOTS_DIR / zip_rel) as zf:
+        return zf.read(rel)
+
+
+def content_rel(meta: dict, file_key: str = None) -> str:
+    """meta 指向的內容（相對 snapshots/）：新格式看 object，舊格式看 file_key 欄位。"""
+    if meta.get("object"):
+        return meta["object"]
+    if file_key and meta.get(file_key):
+        return relative(meta[file_key])
+    return None
+
+
+def exists(meta: dict, file_key: str = None, index: dict = None) -> bool:
+    """meta 指向的內容是否還拿得到（live 或封存）。"""
+    rel = content_rel(meta, file_key)
+    if rel is None:
+        return False
+    if (SNAPSHOTS_DIR / rel).exists():
+        return True
+    return rel in (archive_index() if index is None else index)
+
+
+def history(clinic_dir: Path) -> list:
+    """診所目錄的所有 meta（live + 封存），舊的在前：[(相對路徑, meta, 是否已封存)]。"""
+    prefix = relative(clinic_dir) + "/"
+    index = archive_index()
+    rows = {relative(p): (json.loads(p.read_text(encoding="utf-8")), False)
+            for p in meta_files(clinic_dir)}
+    for rel in index:
+        if rel.startswith(prefix) and rel.endswith("_meta.json") and rel not in rows:
+            rows[rel] = (json.loads(read(rel, index)), True)
+    return [(rel, meta, archived) for rel, (meta, archived) in sorted(rows.items(),
+                                                                        key=lambda x: Path(x[0]).name)]
+
+
+def save(clinic_dir: Path, date_str: str, meta: dict, data: bytes = None,
+         suffix: str = "", file_key: str = "html_file", name: str = "meta") -> dict:
+    """
+    內容存進 objects，寫 {date_str}_{name}.json 指向它，回傳寫入的 meta。
+    data 為 None（例如截圖失敗）時只寫 meta。
+    """
+    clinic_dir = Path(clinic_dir)
+    clinic_dir.mkdir(parents=True, exist_ok=True)
+    meta = dict(meta)
+    if data is not None:
+        previous = latest_meta(clinic_dir)
+        digest, path = put(data, suffix)
+        rel = path.relative_to(SNAPSHOTS_DIR).as_posix()
+        meta.update({
+            file_key: rel,
+            "sha256": digest,
+            "object": rel,
+            "changed": previous is None or previous["sha256"] != digest,
+        })
+    meta_file = clinic_dir / f"{date_str}_{name}.json"
+    atomic_write(meta_file, json.dumps(meta, ensure_ascii=False, indent=2))
+    meta["meta_file"] = str(meta_file)
+    return meta
+
+
+def references() -> dict:
+    """object 相對路徑 → 指向它的 meta 數。"""
+    refs = {}
+    for meta_path in SNAPSHOTS_DIR.glob("*/*/*_meta.json"):
+        obj = json.loads(meta_path.read_text(encoding="utf-8")).get("object")
+        if obj:
+            refs[obj] = refs.get(obj, 0) + 1
+    return refs
+
+
+def main():
+    ap = argparse.ArgumentParser(description="快照內容定址儲存")
+    ap.add_argument("--orphans", action="store_true", help="列出沒有 meta 指向的 objects")
+    ap.add_argument("--history", metavar="DIR", help="列出診所目錄（相對 snapshots/，例如 web/c02）的所有快照")
+    ap.add_argument("--cat", metavar="PATH", help="讀出 snapshots/ 下的檔案（含已封存的）")
+    ap.add_argument("--out", help="--cat 寫到這個檔案（預設 stdout）")
+    args = ap.parse_args()
+
+    if args.history:
+        index = archive_index()
+        for rel, meta, archived in history(SNAPSHOTS_DIR / args.history):
+            content = content_rel(meta, "html_file") or content_rel(meta, "screenshot_file")
+            where = "封存" if archived else "live"
+            state = "" if "changed" not in meta else ("有變動" if meta["changed"] else "未變動")
+            ok = "" if content is None else ("✅" if exists(meta, "html_file", index)
+                                             or exists(meta, "screenshot_file", index) else "❌")
+            print(f"  {Path(rel).name:40} {where:4} {state:4} {ok} {content or ''}")
+        return
+    if args.cat:
+        data = read(args.cat)
+        if data is None:
+            raise SystemExit(f"❌ 找不到 {args.cat}（live 與封存都沒有）")
+        if args.out:
+            Path(args.out).write_bytes(data)
+        else:
+            sys.stdout.buffer.write(data)
+        return
+
+    objects = [p for p in OBJECTS_DIR.glob("*/*") if not p.name.startswith(".")]
+    refs = references()
+    size = sum(p.stat().st_size for p in objects)
+    print(f"objects：{len(objects)} 個，{size:,} bytes；meta 引用 {sum(refs.values())} 次")
+    if args.orphans:
+        for p in objects:
+            if p.relative_to(SNAPSHOTS_DIR).as_posix() not in refs:
+                print(f"  {p}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+schedules.json 共用存取層 — 所有寫入 sessions 的腳本都走這裡。
+
+載入一次後在記憶體建兩組索引：
+  - (clinic_id, date)            → 該診所該日的 sessions（範圍替換用）
+  - (doctor_name, date, slot)    → 同醫師同日同時段的 sessions（衝突檢查 / 查詢用）
+  - (doctor_name, date)          → 同醫師同日的 sessions，附 time_label 解析出的開始 / 結束分鐘（時間重疊用）
+另隨 add / remove 維護「目前有兩筆以上的 (doctor_name, date, slot)」集合，
+衝突查詢不必掃全部 sessions；Transaction 寫回時只檢查本次新增的 sessions 用到的 key。
+
+範圍替換（刪某診所 [date_from, date_to] 舊 sessions、補入新的）只碰該診所有資料的日期，
+不再對整份 7,000+ 筆 sessions 跑 list comprehension。
+sessions 輸出順序與舊寫法相同：保留的舊資料在前、新補入的依序接在後面。
+
+用法（程式內）：
+  from store import ScheduleStore, Transaction
+  store = ScheduleStore.load()
+  removed = store.replace_range("c03", sessions, "2026-06-29", "2026-07-05")
+  store.save()
+
+  # 多家診所一次寫回：見 Transaction
+
+用法（命令列）：
+  # 把 --output 產生的 sessions JSON 合併進 schedules.json（刪該診所該範圍舊 sessions）
+  python3 scraper/store.py --replace c24 /tmp/jr_sessions.json 2026-06-29 2026-08-02
+
+  # 未指定範圍時，以檔案內 sessions 的最早 ~ 最晚日期為範圍
+  python3 scraper/store.py --replace c24 /tmp/jr_sessions.json
+
+  # 多家一次寫回（一次載入、一次檢查、一次寫檔）
+  python3 scraper/store.py --replace c02 /tmp/c02.json 2026-06-29 2026-07-05 \\
+                           --replace c04 /tmp/c04.json 2026-06-29 2026-07-05
+
+  # 衝突檢查（同醫師同日同時段出現兩筆以上）
+  python3 scraper/store.py --conflicts
+
+  # --replace 寫回時只檢查本次新增 sessions 的衝突並印出；加上 --reject-conflicts 則有衝突就不寫回
+  python3 scraper/store.py --replace c24 /tmp/jr_sessions.json --reject-conflicts
+
+  # 另依 time_label 實際時間檢查跨院時間重疊（slot 不同但時間交疊）
+  python3 scraper/store.py --conflicts --overlaps
+
+  # 連同 archive/ 封存的舊 sessions 一起檢查（見 retention.py）
+  python3 scraper/store.py --conflicts --with-archive
+
+  # 改寫進 SQLite schedules.db（之後 db.py --export 寫回 schedules.json）
+  python3 scraper/store.py --replace c24 /tmp/jr_sessions.json --db
+
+  # 上次寫入中斷（留下 schedules.json.journal）時補套用；下次任何寫入也會自動補套用
+  python3 scraper/store.py --recover
+
+寫入安全：所有寫回都走暫存檔 + fsync + rename，Transaction.commit 另持有
+schedules.json.lock 排他鎖並記 journal，多支爬蟲可同時跑。
+commit 寫回後會同步重建衍生檔：前端用的 data/ 週切片（build_shards.py）、
+精簡編碼 schedules.compact.json（compact.py），並記一段版本差異 data/deltas/（delta.py）。
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from timespan import format_span, overlap_groups, session_span
+from validate import format_problems, validate
+
+try:
+    import fcntl
+except ImportError:  # Windows 無 flock：不加鎖，只適合單一程序寫入
+    fcntl = None
+
+SCRAPER_DIR = Path(__file__).resolve().parent
+SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """UTF-8 文字版的 atomic_write_bytes。"""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    先寫同目錄暫存檔 → fsync → rename 覆蓋。
+    中途中斷時原檔不受影響（最多留下 .{name}.*.tmp 暫存檔）。
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 建立的檔案權限為 0600：沿用原檔權限，新檔依 umask
+        os.chmod(tmp, path.stat().st_mode & 0o777 if path.exists() else 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@contextmanager
+def schedule_lock(path: Path = SCHEDULES_JSON):
+    """對 {path}.lock 取 advisory 排他鎖；同時跑的爬蟲會排隊寫入，不會互相覆蓋。"""
+    lock_path = Path(f"{path}.lock")
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"⏳ 其他程序正在寫入 {Path(path).name}，等待中...")
+                fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def journal_path(path: Path = SCHEDULES_JSON) -> Path:
+    return Path(f"{path}.journal")
+
+
+def load_clinics(path: Path = SCHEDULES_JSON) -> list:
+    """只需要診所設定（whitelist / source_url 等）時用，不建 sessions 索引。"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["clinics"]
+
+
+def slot_key(session: dict) -> tuple:
+    """衝突判斷用的 (doctor_name, date, slot)。"""
+    return session.get("doctor_name"), session.get("date", ""), session.get("slot")
+
+
+def session_range(sessions: list) -> tuple:
+    """回傳 sessions 的 (最早日期, 最晚日期)；空 list 回 (None, None)。"""
+    dates = [s["date"] for s in sessions]
+    if not dates:
+        return None, None
+    return min(dates), max(dates)
+
+
+class ScheduleStore:
+    """schedules.json 的記憶體模型（含索引）。"""
+
+    def __init__(self, data: dict, path: Path = SCHEDULES_JSON):
+        self.path = Path(path)
+        self._data = {k: v for k, v in data.items() if k != "sessions"}
+        self._rows = {}              # seq → session（dict 保持插入順序 = 輸出順序）
+        self._seq = 0
+        self._by_clinic_date = {}    # (clinic_id, date) → [seq]
+        self._clinic_dates = {}      # clinic_id → {date}
+        self._by_slot = {}           # (doctor_name, date, slot) → [seq]
+        self._conflict_keys = {}     # _by_slot 中有兩筆以上的 key（dict 當有序集合）
+        self._by_doctor_date = {}    # (doctor_name, date) → [seq]
+        self._spans = {}             # seq → (start_min, end_min, exact)（見 timespan.py）
+        for s in data.get("sessions", []):
+            self.add(s)
+
+    @classmethod
+    def load(cls, path: Path = SCHEDULES_JSON) -> "ScheduleStore":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), path)
+
+    # ── 查詢 ──────────────────────────────────────────────
+
+    @property
+    def meta(self) -> dict:
+        return self._data.setdefault("meta", {})
+
+    @property
+    def clinics(self) -> list:
+        return self._data.setdefault("clinics", [])
+
+    def clinic(self, clinic_id: str) -> dict:
+        """回傳診所設定；找不到回空 dict。"""
+        return next((c for c in self.clinics if c["id"] == clinic_id), {})
+
+    def sessions(self) -> list:
+        return list(self._rows.values())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def clinic_dates(self, clinic_id: str, date_from: str = None, date_to: str = None) -> list:
+        """該診所在 [date_from, date_to] 內有 sessions 的日期（已排序）。None 表示不設限。"""
+        dates = self._clinic_dates.get(clinic_id, ())
+        return sorted(d for d in dates
+                      if (date_from is None or d >= date_from) and (date_to is None or d <= date_to))
+
+    def sessions_for(self, clinic_id: str, date_from: str = None, date_to: str = None) -> list:
+        """該診所 [date_from, date_to] 內的 sessions，依日期排序。"""
+        out = []
+        for d in self.clinic_dates(clinic_id, date_from, date_to):
+            out.extend(self._rows[seq] for seq in self._by_clinic_date[(clinic_id, d)])
+        return out
+
+    def at(self, doctor_name: str, date: str, slot: str) -> list:
+        """同醫師同日同時段的所有 sessions。"""
+        return [self._rows[seq] for seq in self._by_slot.get((doctor_name, date, slot), ())]
+
+    def conflicts(self, keys=None) -> dict:
+        """
+        (doctor_name, date, slot) → sessions，只列出現兩筆以上者。
+        指定 keys 時只檢查這些 key（寫入後只查本次新增的 sessions 用）。
+        """
+        keys = self._conflict_keys if keys is None else [k for k in dict.fromkeys(keys) if k in self._conflict_keys]
+        return {key: [self._rows[seq] for seq in self._by_slot[key]] for key in keys}
+
+    def overlaps(self, keys=None) -> dict:
+        """
+        (doctor_name, date) → 時間交疊的群組 [[(span, session), ...]]。
+        只列跨診所、且 slot 不全相同的群組（slot 相同者 conflicts() 已回報）。
+        指定 keys（(doctor_name, date)）時只檢查這些醫師日。
+        """
+        keys = self._by_doctor_date if keys is None else dict.fromkeys(keys)
+        found = {}
+        for key in keys:
+            seqs = self._by_doctor_date.get(key, ())
+            if len(seqs) < 2:
+                continue
+            groups = [g for g in overlap_groups([(self._spans[seq], self._rows[seq]) for seq in seqs])
+                      if len({s["clinic_id"] for _, s in g}) > 1 and len({s["slot"] for _, s in g}) > 1]
+            if groups:
+                found[key] = groups
+        return found
+
+    # ── 寫入 ──────────────────────────────────────────────
+
+    def add(self, session: dict) -> None:
+        seq = self._seq
+        self._seq += 1
+        self._rows[seq] = session
+        cid, date = session.get("clinic_id"), session.get("date", "")
+        self._by_clinic_date.setdefault((cid, date), []).append(seq)
+        self._clinic_dates.setdefault(cid, set()).add(date)
+        seqs = self._by_slot.setdefault(slot_key(session), [])
+        seqs.append(seq)
+        if len(seqs) == 2:
+            self._conflict_keys[slot_key(session)] = None
+        self._by_doctor_date.setdefault((session.get("doctor_name"), date), []).append(seq)
+        self._spans[seq] = session_span(session)
+
+    def remove_range(self, clinic_id: str, date_from: str = None, date_to: str = None) -> int:
+        """刪該診所 [date_from, date_to] 的 sessions，回傳刪除筆數。"""
+        removed = 0
+        for d in self.clinic_dates(clinic_id, date_from, date_to):
+            for seq in self._by_clinic_date.pop((clinic_id, d)):
+                s = self._rows.pop(seq)
+                key = slot_key(s)
+                seqs = self._by_slot[key]
+                seqs.remove(seq)
+                if len(seqs) < 2:
+                    self._conflict_keys.pop(key, None)
+                if not seqs:
+                    del self._by_slot[key]
+                day_key = (s.get("doctor_name"), d)
+                day = self._by_doctor_date[day_key]
+                day.remove(seq)
+                if not day:
+                    del self._by_doctor_date[day_key]
+                del self._spans[seq]
+                removed += 1
+            self._clinic_dates[clinic_id].discard(d)
+        return removed
+
+    def replace_range(self, clinic_id: str, sessions: list,
+                      date_from: str = None, date_to: str = None) -> int:
+        """刪該診所 [date_from, date_to] 舊 sessions、補入新的，回傳刪除筆數。"""
+        removed = self.remove_range(clinic_id, date_from, date_to)
+        for s in sessions:
+            self.add(s)
+        return removed
+
+    def ensure_clinic(self, clinic: dict) -> bool:
+        """診所不存在時加入 clinics，回傳是否新增。"""
+        if self.clinic(clinic["id"]):
+            return False
+        self.clinics.append(clinic)
+        return True
+
+    def to_dict(self) -> dict:
+        return dict(self._data, sessions=self.sessions())
+
+    def save(self, path: Path = None) -> None:
+        """
+        原子寫回 JSON（ensure_ascii=False, indent=2）並更新 meta.generated_at。
+        檔尾不加換行，與版控中的 schedules.json 一致，避免無謂的一 byte diff。
+        """
+        self.meta["generated_at"] = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        atomic_write(path or self.path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+
+def conflict_problems(found: dict) -> list:
+    """衝突 → 問題清單（拒絕寫回時的錯誤訊息，格式同 print_conflicts 的第一行）。"""
+    return [f"衝突: 醫師={doctor} 日期={date} 時段={slot}（{'、'.join(s['clinic_id'] for s in entries)}）"
+            for (doctor, date, slot), entries in found.items()]
+
+
+# 須存在且不為 None；time_label 可為空字串（同 validate）
+REQUIRED_KEYS = ("id", "doctor_name", "clinic_id", "date", "slot", "time_label")
+
+
+class Transaction:
+    """
+    收集多家診所的範圍替換，commit() 時一次載入、一次檢查、一次寫入。
+
+      txn = Transaction()
+      txn.replace("c03", c03_sessions, "2026-06-29", "2026-07-05")
+      txn.replace("c24", c24_sessions, "2026-06-29", "2026-08-02")
+      report = txn.commit()     # {"c03": (刪舊, 新增), "c24": (刪舊, 新增)}
+
+    也可當 context manager 使用，區塊正常結束時自動 commit。
+
+    衝突（同醫師同日同時段兩筆以上）只檢查本次新增 sessions 的 (doctor_name, date, slot)，
+    結果放在 txn.conflicts；reject_conflicts=True 時有衝突就不寫回並丟 ValueError。
+
+    commit 全程持有 schedule_lock；寫檔前先把待套用的替換存成 {path}.journal，
+    寫完才刪。若上次在寫檔途中中斷，下次 commit（或 store.py --recover）會先補套用 journal。
+    範圍替換本身是冪等的，重複套用結果相同。
+    """
+
+    def __init__(self, path: Path = SCHEDULES_JSON, reject_conflicts: bool = False):
+        self.path = Path(path)
+        self.reject_conflicts = reject_conflicts
+        self._ops = []          # (clinic_id, sessions, date_from, date_to)
+        self._clinics = []      # ensure_clinic 待加入的診所設定
+        self.store = None       # commit 後寫回的 ScheduleStore
+        self.total = None       # commit 後的總 sessions 數
+        self.conflicts = {}     # commit 後：本次新增 sessions 造成 / 涉入的衝突
+        self.overlaps = {}      # commit 後：本次新增 sessions 涉入的跨院時間重疊（只提示，不擋寫回）
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self._ops:
+            self.commit()
+        return False
+
+    def __len__(self):
+        return len(self._ops)
+
+    def replace(self, clinic_id: str, sessions: list,
+                date_from: str = None, date_to: str = None) -> None:
+        """排入一筆範圍替換；多筆依加入順序套用。"""
+        self._ops.append((clinic_id, list(sessions), date_from, date_to))
+
+    def ensure_clinic(self, clinic: dict) -> None:
+        self._clinics.append(clinic)
+
+    def apply(self, store: ScheduleStore) -> dict:
+        """套用到已載入的 store（不寫檔），回傳每診所 (刪舊, 新增)。"""
+        for clinic in self._clinics:
+            store.ensure_clinic(clinic)
+        report = {}
+        for clinic_id, sessions, date_from, date_to in self._ops:
+            removed = store.replace_range(clinic_id, sessions, date_from, date_to)
+            prev_removed, prev_added = report.get(clinic_id, (0, 0))
+            report[clinic_id] = (prev_removed + removed, prev_added + len(sessions))
+        return report
+
+    def check(self, store: ScheduleStore) -> list:
+        """
+        檢查本次新增的 sessions 必要欄位齊全、clinic_id 與替換對象相符，
+        再對套用後的整份資料跑 validate（日期、slot、clinic_id 存在、id 不重複等）。回傳問題清單。
+        """
+        problems = []
+        for clinic_id, sessions, _, _ in self._ops:
+            for s in sessions:
+                missing = [k for k in REQUIRED_KEYS if k not in s or s[k] is None]
+                if missing:
+                    problems.append(f"{clinic_id} {s.get('id')}: 缺欄位 {', '.join(missing)}")
+                if s.get("clinic_id") != clinic_id:
+                    problems.append(f"{clinic_id} {s.get('id')}: clinic_id 為 {s.get('clinic_id')}，與替換對象不符")
+        data = store.to_dict()
+        return problems + format_problems(validate(data), data["sessions"])
+
+    def added_keys(self) -> list:
+        """本次新增 sessions 的 (doctor_name, date, slot)。"""
+        return [slot_key(s) for _, sessions, _, _ in self._ops for s in sessions]
+
+    def commit_db(self, db_path: Path = None) -> dict:
+        """
+        改寫進 schedules.db（見 db.py）：全部替換在同一個 SQLite transaction，走索引刪除 + 批次新增，
+        不重寫 schedules.json；檢查失敗時整批 rollback 並丟 ValueError。回傳每診所 (刪舊, 新增)。
+        """
+        from db import SCHEDULES_DB, ScheduleDB   # 延遲載入：db 依賴本模組
+        with ScheduleDB(db_path or SCHEDULES_DB) as db:
+            report, self.conflicts = db.replace_ranges(self._ops, self._clinics, self.reject_conflicts)
+            self.total = len(db)
+        self._ops, self._clinics = [], []
+        return report
+
+    def commit(self) -> dict:
+        """載入 → 套用全部替換 → 檢查 → 原子寫回；檢查失敗時不寫檔並丟 ValueError。"""
+        with schedule_lock(self.path):
+            _recover_locked(self.path)
+            return self._commit_locked()
+
+    def _commit_locked(self) -> dict:
+        journal = journal_path(self.path)
+        self._write_journal(journal)
+        store = ScheduleStore.load(self.path)
+        previous = store.sessions()
+        report = self.apply(store)
+        found = store.conflicts(self.added_keys())
+        problems = self.check(store)
+        if self.reject_conflicts:
+            problems += conflict_problems(found)
+        if problems:
+            journal.unlink()
+            raise ValueError("sessions 檢查未通過，未寫回：\n  " + "\n  ".join(problems))
+        store.save()
+        journal.unlink()
+        write_derived(store, previous)
+        self.store, self.total, self.conflicts = store, len(store), found
+        self.overlaps = store.overlaps((d, date) for d, date, _ in self.added_keys())
+        self._ops, self._clinics = [], []
+        return report
+
+    def _write_journal(self, journal: Path) -> None:
+        entry = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "clinics": self._clinics,
+            "reject_conflicts": self.reject_conflicts,
+            "ops": [{"clinic_id": cid, "date_from": f, "date_to": t, "sessions": ss}
+                    for cid, ss, f, t in self._ops],
+        }
+        atomic_write(journal, json.dumps(entry, ensure_ascii=False))
+
+    @classmethod
+    def from_journal(cls, journal: Path, path: Path = SCHEDULES_JSON) -> "Transaction":
+        with open(journal, encoding="utf-8") as f:
+            entry = json.load(f)
+        txn = cls(path, entry.get("reject_conflicts", False))
+        for clinic in entry.get("clinics", []):
+            txn.ensure_clinic(clinic)
+        for op in entry["ops"]:
+            txn.replace(op["clinic_id"], op["sessions"], op["date_from"], op["date_to"])
+        return txn
+
+
+def write_derived(store: ScheduleStore, previous: list) -> list:
+    """
+    正本寫回後重建衍生檔：data/ 週切片、schedules.compact.json、previous → 目前的 delta。
+    此時正本已寫回：單一衍生檔失敗（例如精簡檔來回比對不一致）只印警告、不影響其他衍生檔，
+    也不讓呼叫端以為寫回失敗。回傳失敗的衍生檔名稱。
+    """
+    import build_shards   # 延遲載入：衍生檔模組都依賴本模組
+    import compact
+    import delta
+    writers = (
+        ("data/ 週切片", "python3 scraper/build_shards.py",
+         lambda: build_shards.build(store)),
+        (compact.COMPACT_JSON.name, "python3 scraper/compact.py",
+         lambda: compact.write(store.to_dict(), store.path.with_name(compact.COMPACT_JSON.name))),
+        ("delta", "python3 scraper/delta.py --since-git HEAD",
+         lambda: delta.record(previous, store.sessions(), store.path)),
+    )
+    failed = []
+    for name, rebuild, write in writers:
+        try:
+            write()
+        except Exception as e:
+            print(f"⚠️  衍生檔 {name} 重建失敗：{e}（schedules.json 已寫回；修正後執行 {rebuild}）")
+            failed.append(name)
+    return failed
+
+
+@contextmanager
+def locked_store(path: Path = SCHEDULES_JSON):
+    """
+    不是「某診所某範圍」替換的整批維護（例如封存舊 sessions）用：
+    持鎖、先補套用殘留 journal、載入 store 交給區塊修改；區塊正常結束且有改動才寫回並重建衍生檔。
+    """
+    with schedule_lock(path):
+        _recover_locked(path)
+        store = ScheduleStore.load(path)
+        previous = store.sessions()
+        yield store
+        if store.sessions() == previous:
+            return
+        data = store.to_dict()
+        problems = format_problems(validate(data), data["sessions"])
+        if problems:
+            raise ValueError("sessions 檢查未通過，未寫回：\n  " + "\n  ".join(problems))
+        store.save()
+        write_derived(store, previous)
+
+
+def _recover_locked(path: Path) -> dict:
+    """（需已持有 schedule_lock）有殘留 journal 時補套用，回傳其報告；無則回 None。"""
+    journal = journal_path(path)
+    if not journal.exists():
+        return None
+    txn = Transaction.from_journal(journal, path)
+    print(f"⚠️  發現上次未完成的寫入（{journal.name}），補套用 {len(txn)} 筆範圍替換")
+    report = txn._commit_locked()
+    print_report(report)
+    return report
+
+
+def recover(path: Path = SCHEDULES_JSON) -> dict:
+    """補套用上次中斷的寫入；無殘留 journal 回 None。"""
+    with schedule_lock(path):
+        return _recover_locked(path)
+
+
+def print_report(report: dict) -> None:
+    """每診所一行：刪舊 / 新增。"""
+    for clinic_id, (removed, added) in report.items():
+        print(f"  {clinic_id}：刪舊 {removed} / 新增 {added}")
+
+
+def parse_replace(values: list) -> tuple:
+    """解析 CLI --replace CLINIC SESSIONS_JSON [DATE_FROM DATE_TO] → (clinic_id, sessions, from, to)。"""
+    if len(values) not in (2, 4):
+        raise SystemExit(f"--replace 需要 CLINIC SESSIONS_JSON [DATE_FROM DATE_TO]：{values}")
+    clinic_id, sessions_path = values[:2]
+    with open(sessions_path, encoding="utf-8") as f:
+        sessions = json.load(f)
+    date_from, date_to = values[2:] if len(values) == 4 else session_range(sessions)
+    if date_from is None or date_to is None:
+        raise SystemExit(f"{sessions_path} sessions 為空且未指定範圍，不寫回")
+    return clinic_id, sessions, date_from, date_to
+
+
+def print_conflicts(store: ScheduleStore, found: dict = None) -> int:
+    """印出 SOP 格式的衝突報告（預設全部，或指定 found，例如 txn.conflicts），回傳衝突數。"""
+    names = {c["id"]: c["name"] for c in store.clinics}
+    found = store.conflicts() if found is None else found
+    for (doctor, date, slot), entries in found.items():
+        print(f"衝突: 醫師={doctor} 日期={date} 時段={slot}")
+        for s in entries:
+            print(f"  → {s['clinic_id']} {names.get(s['clinic_id'], s['clinic_id'])}")
+    return len(found)
+
+
+def print_overlaps(store: ScheduleStore, found: dict = None) -> int:
+    """印出跨院時間重疊（預設全部，或指定 found，例如 txn.overlaps），回傳群組數。"""
+    names = {c["id"]: c["name"] for c in store.clinics}
+    found = store.overlaps() if found is None else found
+    count = 0
+    for (doctor, date), groups in found.items():
+        for group in groups:
+            print(f"時間重疊: 醫師={doctor} 日期={date}")
+            for span, s in group:
+                print(f"  → {s['clinic_id']} {names.get(s['clinic_id'], s['clinic_id'])}"
+                      f" {s['slot']} {format_span(span)}")
+            count += 1
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description="schedules.json 共用存取層")
+    ap.add_argument("--replace", nargs="+", action="append", default=[],
+                    metavar="CLINIC SESSIONS_JSON [DATE_FROM DATE_TO]",
+                    help="以 sessions JSON 取代該診所範圍內舊 sessions；可重複，全部一次寫回")
+    ap.add_argument("--conflicts", action="store_true", help="衝突檢查")
+    ap.add_argument("--recover", action="store_true", help="補套用上次中斷的寫入（journal）")
+    ap.add_argument("--db", action="store_true", help="--replace 改寫進 schedules.db（見 db.py）")
+    ap.add_argument("--reject-conflicts", action="store_true", help="--replace 造成衝突時整批不寫回")
+    ap.add_argument("--overlaps", action="store_true",
+                    help="--conflicts 另檢查跨院時間重疊（依 time_label 實際時間，見 timespan.py）")
+    ap.add_argument("--with-archive", action="store_true", help="--conflicts 連同封存的舊 sessions 一起檢查")
+    args = ap.parse_args()
+
+    if args.recover and recover() is None:
+        print("✅ 沒有未完成的寫入")
+
+    if args.replace:
+        txn = Transaction(reject_conflicts=args.reject_conflicts)
+        for values in args.replace:
+            clinic_id, sessions, date_from, date_to = parse_replace(values)
+            print(f"  {clinic_id} {date_from} ~ {date_to}：{len(sessions)} 筆")
+            txn.replace(clinic_id, sessions, date_from, date_to)
+        if args.db:
+            report = txn.commit_db()
+            print(f"✅ 已寫入 schedules.db（總 sessions {txn.total}）")
+        else:
+            report = txn.commit()
+            print("✅ 已寫回 schedules.json")
+        print_report(report)
+        if txn.conflicts:
+            print_conflicts(txn.store or ScheduleStore.load(), txn.conflicts)
+        if txn.overlaps:
+            print_overlaps(txn.store, txn.overlaps)
+
+    if args.conflicts or not (args.replace or args.recover):
+        store = ScheduleStore.load()
+        if args.with_archive:
+            from retention import with_archive
+            store = ScheduleStore({**store.to_dict(), "sessions": with_archive(store.sessions())}, store.path)
+        if not print_conflicts(store):
+            print("✅ 無衝突")
+        if args.overlaps and not print_overlaps(store):
+            print("✅ 無時間重疊")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+time_label → 開始 / 結束分鐘數，以及同醫師同日的時間重疊偵測
+
+各來源都把實際時間寫在 time_label：
+  kaomei   「下午 14:30–17:30」
+  vision   「晚診 18:00–20:30」
+  hixcare  「早診 09:00–12:00」（startTime / endTime 組成）
+  CXMS 等  「14:00-17:00」、「早 8:30–11:00」
+只有時段名（「早診」、「上午一診」）或空字串時，以 slot 的預設時間窗代替（exact=False）。
+
+衝突檢查（store.py --conflicts）只比 slot 名稱；時間重疊能抓到 slot 不同但時間交疊的跨院班，
+例如 A 院「下午 15:30–19:00」與 B 院「晚診 18:00–21:00」。
+ScheduleStore 在載入 / 新增 session 時就解析好時間並依 (doctor_name, date) 建索引，
+每位醫師每天只有少數幾筆，各自依開始時間排序後掃一遍即可找出重疊群組。
+
+用法：
+  # 全部時間重疊（slot 相同者已由 --conflicts 回報，不重複列出）
+  python3 scraper/timespan.py
+
+  # 列出無法解析實際時間（以 slot 預設時間窗代替）的 time_label
+  python3 scraper/timespan.py --labels
+"""
+
+import argparse
+import re
+
+TIME_RANGE = re.compile(r"(\d{1,2}):(\d{2})\s*[–—~\-－]\s*(\d{1,2}):(\d{2})")
+
+# time_label 沒有實際時間時用的預設時間窗（分鐘）
+SLOT_WINDOWS = {
+    "morning": (8 * 60, 12 * 60 + 30),
+    "afternoon": (13 * 60, 18 * 60),
+    "evening": (18 * 60, 22 * 60),
+}
+
+_cache = {}
+
+
+def parse_time_label(label: str, slot: str = None) -> tuple:
+    """
+    '下午 14:30–17:30' → (870, 1050, True)。
+    沒有 HH:MM–HH:MM 時回 slot 的預設時間窗 (start, end, False)；slot 也未知時回 None。
+    """
+    key = (label, slot)
+    if key not in _cache:
+        m = TIME_RANGE.search(label or "")
+        if m:
+            h1, m1, h2, m2 = map(int, m.groups())
+            _cache[key] = (h1 * 60 + m1, h2 * 60 + m2, True)
+        elif slot in SLOT_WINDOWS:
+            _cache[key] = (*SLOT_WINDOWS[slot], False)
+        else:
+            _cache[key] = None
+    return _cache[key]
+
+
+def session_span(session: dict) -> tuple:
+    return parse_time_label(session.get("time_label"), session.get("slot"))
+
+
+def format_span(span: tuple) -> str:
+    if span is None:
+        return "時間不明"
+    start, end, exact = span
+    text = f"{start // 60:02d}:{start % 60:02d}–{end // 60:02d}:{end % 60:02d}"
+    return text if exact else f"{text}（預設）"
+
+
+def overlap_groups(entries: list) -> list:
+    """
+    entries：[(span, session)]（同醫師同日）。依開始時間排序後掃描，
+    回傳時間互相交疊（首尾相接不算）的群組 [[(span, session), ...]]，只列兩筆以上者。
+    """
+    timed = sorted((e for e in entries if e[0] is not None), key=lambda e: (e[0][0], e[0][1]))
+    groups, current, current_end = [], [], -1
+    for span, s in timed:
+        if current and span[0] < current_end:
+            current.append((span, s))
+            current_end = max(current_end, span[1])
+            continue
+        if len(current) > 1:
+            groups.append(current)
+        current, current_end = [(span, s)], span[1]
+    if len(current) > 1:
+        groups.append(current)
+    return groups
+
+
+def main():
+    from store import ScheduleStore, print_overlaps
+
+    ap = argparse.ArgumentParser(description="時間重疊偵測")
+    ap.add_argument("--labels", action="store_true", help="列出無法解析實際時間的 time_label")
+    args = ap.parse_args()
+
+    store = ScheduleStore.load()
+    if args.labels:
+        counts = {}
+        for s in store.sessions():
+            if not session_span(s) or not session_span(s)[2]:
+                key = (s.get("time_label"), s.get("slot"))
+                counts[key] = counts.get(key, 0) + 1
+        for (label, slot), n in sorted(counts.items(), key=lambda x: -x[1]):
+            print(f"  {n:>5}  {slot:<9} {label!r} → {format_span(parse_time_label(label, slot))}")
+        return
+
+    if not print_overlaps(store):
+        print("✅ 無時間重疊")
+
+
+if __name__ == "__main__":
+    main()
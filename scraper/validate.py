@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+schedules.json 格式檢查 — 一次掃過全部 sessions，列出每個問題與其 sessions 索引
+
+檢查項目：
+  - clinics：id 必填且不重複、name 必填
+  - sessions：必要欄位（id / doctor_name / clinic_id / date / slot）為非空字串，
+    time_label / source_note 為字串，沒有格式外的欄位
+  - date 為存在的日期 YYYY-MM-DD、slot 在 SLOTS 內、clinic_id 在 clinics 內
+  - session id 不重複（vision、kaomei 等各自產生 id 後綴，撞號時列出兩筆的索引）
+
+診所 id、slot、已驗證過的日期都先收成 set / dict，每筆 session 只做幾次查表。
+所有寫回路徑（Transaction.commit、locked_store、db.py --export / --replace）寫檔前都會跑，
+有問題就不寫。
+
+用法：
+  python3 scraper/validate.py
+  python3 scraper/validate.py --file /tmp/schedules.json
+"""
+
+import argparse
+import json
+import re
+import time
+from datetime import date
+
+SLOTS = ["morning", "afternoon", "evening", "other", "custom"]
+REQUIRED = ("id", "doctor_name", "clinic_id", "date", "slot")
+OPTIONAL = ("time_label", "source_note")
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class Validator:
+    """預先建好查表用的 set；check() 逐筆檢查並累積 problems [(sessions 索引, 訊息)]。"""
+
+    def __init__(self, clinic_ids, seen_ids: dict = None):
+        self.clinic_ids = set(clinic_ids)
+        self.slots = set(SLOTS)
+        self.keys = set(REQUIRED + OPTIONAL)
+        self.seen_ids = {} if seen_ids is None else seen_ids   # id → 第一次出現的索引
+        self._dates = {}                                       # date 字串 → 是否合法
+        self.problems = []
+
+    def _valid_date(self, value: str) -> bool:
+        ok = self._dates.get(value)
+        if ok is None:
+            ok = bool(DATE_PATTERN.fullmatch(value))
+            if ok:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    ok = False
+            self._dates[value] = ok
+        return ok
+
+    def check(self, index: int, s) -> None:
+        problem = self.problems.append
+        if not isinstance(s, dict):
+            problem((index, f"不是物件：{s!r}"))
+            return
+        for key in REQUIRED:
+            value = s.get(key)
+            if not isinstance(value, str) or not value:
+                problem((index, f"{key} 缺少或不是非空字串：{value!r}"))
+        for key in OPTIONAL:
+            if key in s and not isinstance(s[key], str):
+                problem((index, f"{key} 不是字串：{s[key]!r}"))
+        if "time_label" not in s:
+            problem((index, "缺 time_label"))
+        extra = s.keys() - self.keys
+        if extra:
+            problem((index, f"格式外的欄位：{', '.join(sorted(extra))}"))
+
+        d = s.get("date")
+        if isinstance(d, str) and d and not self._valid_date(d):
+            problem((index, f"日期不合法：{d}"))
+        slot = s.get("slot")
+        if isinstance(slot, str) and slot and slot not in self.slots:
+            problem((index, f"未知 slot：{slot}"))
+        clinic_id = s.get("clinic_id")
+        if isinstance(clinic_id, str) and clinic_id and clinic_id not in self.clinic_ids:
+            problem((index, f"clinic_id 不在 clinics：{clinic_id}"))
+        sid = s.get("id")
+        if isinstance(sid, str) and sid:
+            first = self.seen_ids.setdefault(sid, index)
+            if first != index:
+                problem((index, f"session id 重複：{sid}（與 sessions[{first}]）"))
+
+
+def validate(data: dict) -> list:
+    """檢查整份資料，回傳 [(sessions 索引, 訊息)]；clinics 的問題索引為 None。"""
+    problems = []
+    clinic_ids = set()
+    for i, c in enumerate(data.get("clinics") or []):
+        cid = c.get("id") if isinstance(c, dict) else None
+        if not isinstance(cid, str) or not cid:
+            problems.append((None, f"clinics[{i}] 缺 id"))
+            continue
+        if cid in clinic_ids:
+            problems.append((None, f"clinics[{i}] id 重複：{cid}"))
+        if not c.get("name"):
+            problems.append((None, f"clinics[{i}] {cid} 缺 name"))
+        clinic_ids.add(cid)
+
+    sessions = data.get("sessions")
+    if not isinstance(sessions, list):
+        return problems + [(None, "sessions 不是陣列")]
+    v = Validator(clinic_ids)
+    for i, s in enumerate(sessions):
+        v.check(i, s)
+    return problems + v.problems
+
+
+def format_problems(problems: list, sessions: list = None) -> list:
+    """[(索引, 訊息)] → 可讀字串（有 sessions 時附上該筆 id / 診所 / 日期）。"""
+    out = []
+    for index, message in problems:
+        if index is None:
+            out.append(message)
+            continue
+        s = sessions[index] if sessions is not None else None
+        where = (f" {s.get('clinic_id')} {s.get('date')} {s.get('id')}"
+                 if isinstance(s, dict) else "")
+        out.append(f"sessions[{index}]{where}: {message}")
+    return out
+
+
+def main():
+    from store import SCHEDULES_JSON
+
+    ap = argparse.ArgumentParser(description="schedules.json 格式檢查")
+    ap.add_argument("--file", default=str(SCHEDULES_JSON), help="要檢查的檔案（預設 schedules.json）")
+    args = ap.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        data = json.load(f)
+    t0 = time.perf_counter()
+    problems = validate(data)
+    elapsed = (time.perf_counter() - t0) * 1000
+    for line in format_problems(problems, data.get("sessions")):
+        print(f"  {line}")
+    if problems:
+        print(f"⚠️  {len(problems)} 個問題（{elapsed:.1f} ms）")
+        raise SystemExit(1)
+    print(f"✅ 格式正確（{len(data['sessions'])} 筆 sessions，{elapsed:.1f} ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,24 +20,26 @@ Vision.com.tw 班表爬蟲 - 適用於展望亞洲科技 (vision.com.tw) 系統
   # 爬取指定起始日
   python3 vision_scraper.py --clinic c24 --start-date 2026-04-06
 
-  # 爬取多週（預設 5 週）
+  # 爬取多週（預設 5 週）；各週同時查詢，速率由 fetch 的 token bucket 控制
   python3 vision_scraper.py --clinic c24 --weeks 8
+
+  # 多家 / 全部 vision 診所同時爬取
+  python3 vision_scraper.py --all --weeks 8
+
+  # 錄下 / 離線重播（重播時需同樣的 --start-date 與 --weeks）
+  python3 vision_scraper.py --clinic c24 --start-date 2026-04-06 --record /tmp/rec/c24
+  python3 vision_scraper.py --clinic c24 --start-date 2026-04-06 --replay /tmp/rec/c24
 """
 
 import argparse
+import asyncio
 import json
 import re
-import ssl
-import time
-import urllib.request
-import urllib.parse
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# 部分 vision.com.tw 站台 SSL 憑證鏈不完整，跳過驗證
-SSL_CTX = ssl.create_default_context()
-SSL_CTX.check_hostname = False
-SSL_CTX.verify_mode = ssl.CERT_NONE
+import fetch
+from store import load_clinics
 
 SCRAPER_DIR = Path(__file__).parent
 SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
@@ -60,23 +62,15 @@ SLOT_MAP = {
 
 SLOT_CHAR = {"morning": "m", "afternoon": "a", "evening": "e"}
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/121.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-    "Content-Type": "application/x-www-form-urlencoded",
-    "Referer": "https://14387.vision.com.tw/Register",
-}
-
-
-def fetch_week_html(base_url: str, date_str: str) -> str:
-    """POST /Register 取得指定週 HTML"""
-    body = urllib.parse.urlencode({"date": date_str, "type": 1}).encode()
-    req = urllib.request.Request(base_url, data=body, headers=HEADERS, method="POST")
-    with urllib.request.urlopen(req, timeout=15, context=SSL_CTX) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+async def fetch_week_html(base_url: str, date_str: str) -> str:
+    """
+    POST /Register 取得指定週 HTML（部分 vision.com.tw 站台 SSL 憑證鏈不完整，跳過驗證）。
+    這個 POST 只是查詢、不改資料，標成 idempotent 讓 fetch 失敗時重試。
+    """
+    resp = await fetch.client().post(base_url, data={"date": date_str, "type": 1},
+                                     headers={"Accept": fetch.HTML_ACCEPT, "Referer": base_url},
+                                     verify=False, idempotent=True)
+    return resp.text("utf-8")
 
 
 def parse_sessions(html: str, clinic_id: str, abbrev: str, whitelist: list) -> list:
@@ -140,68 +134,101 @@ def get_monday(date: datetime) -> datetime:
     return date - timedelta(days=date.weekday())
 
 
-def scrape_clinic(clinic_id: str, start_date: datetime = None, weeks: int = 5) -> list:
-    """爬取指定診所未來 N 週班表"""
+async def _fetch_week(config: dict, clinic_id: str, query_date: datetime, whitelist: list) -> list:
+    """抓一週並立刻解析（各週同時進行，抓到哪週就先解析哪週）。"""
+    date_str = query_date.strftime("%Y-%m-%d")
+    try:
+        html = await fetch_week_html(config["base_url"], date_str)
+    except Exception as e:
+        print(f"  ❌ {config['name']} date={date_str} 爬取失敗: {e}")
+        raise fetch.SourceError(f"{clinic_id} date={date_str} 抓取失敗：{e}") from e
+    sessions = parse_sessions(html, clinic_id, config["abbrev"], whitelist)
+    print(f"  📅 {config['name']} 目標週 {(query_date + timedelta(weeks=1)).strftime('%Y-%m-%d')} 起："
+          f"{len(sessions)} 筆（{whitelist} 過濾後）")
+    return sessions
+
+
+async def scrape_clinic(clinic_id: str, start_date: datetime = None, weeks: int = 5,
+                        whitelist: list = None) -> list:
+    """
+    爬取指定診所未來 N 週班表。各週查詢同時發出（同 host 的速率由 fetch 的 token bucket 控制），
+    結果依週次順序合併、以 session id 去重，輸出與逐週抓取相同。
+    whitelist 未指定時從 schedules.json 讀；多家診所請用 scrape_clinics（只讀一次）。
+    任一週（重試後）仍抓取失敗就丟 fetch.SourceError：缺週的結果拿去範圍替換會刪掉該週的舊資料。
+    """
     config = VISION_CLINICS.get(clinic_id)
     if not config:
         raise ValueError(f"未知診所 ID: {clinic_id}")
 
-    # 載入 whitelist
-    with open(SCHEDULES_JSON, encoding="utf-8") as f:
-        sched = json.load(f)
-    clinic_cfg = next((c for c in sched["clinics"] if c["id"] == clinic_id), {})
-    whitelist = clinic_cfg.get("whitelist", [])
+    if whitelist is None:
+        clinic_cfg = next((c for c in load_clinics(SCHEDULES_JSON) if c["id"] == clinic_id), {})
+        whitelist = clinic_cfg.get("whitelist", [])
 
     if start_date is None:
         start_date = datetime.now()
 
-    all_sessions = []
-    seen_session_ids = set()
-
     # 每次查詢：從上週一開始，往後 weeks 週（系統返回下週資料）
     # 所以 query_monday = target_week_monday - 7 days
     target_monday = get_monday(start_date)
+    query_dates = [target_monday + timedelta(weeks=week_offset) - timedelta(weeks=1)
+                   for week_offset in range(weeks)]
+    print(f"  🕷️  {config['name']}：同時查詢 {weeks} 週（{query_dates[0].strftime('%Y-%m-%d')} 起）")
+    by_week = await asyncio.gather(*(_fetch_week(config, clinic_id, d, whitelist) for d in query_dates))
 
-    for week_offset in range(weeks):
-        query_date = target_monday + timedelta(weeks=week_offset) - timedelta(weeks=1)
-        date_str = query_date.strftime("%Y-%m-%d")
-
-        print(f"  📅 查詢 {config['name']} date={date_str}（目標週：{(query_date + timedelta(weeks=1)).strftime('%Y-%m-%d')} 起）...")
-
-        try:
-            html = fetch_week_html(config["base_url"], date_str)
-            sessions = parse_sessions(html, clinic_id, config["abbrev"], whitelist)
-
-            # 去重
-            new_sessions = [s for s in sessions if s["id"] not in seen_session_ids]
-            seen_session_ids.update(s["id"] for s in new_sessions)
-            all_sessions.extend(new_sessions)
-
-            print(f"    → 找到 {len(new_sessions)} 筆（{whitelist} 過濾後）")
-            time.sleep(1)
+    # 依週次順序合併去重
+    all_sessions = []
+    seen_session_ids = set()
+    for sessions in by_week:
+        new_sessions = [s for s in sessions if s["id"] not in seen_session_ids]
+        seen_session_ids.update(s["id"] for s in new_sessions)
+        all_sessions.extend(new_sessions)
+    return all_sessions
 
-        except Exception as e:
-            print(f"  ❌ 爬取失敗: {e}")
 
-    return all_sessions
+async def scrape_clinics(clinic_ids: list, start_date: datetime = None, weeks: int = 5) -> dict:
+    """
+    多家 vision 診所同時爬取（不同 host 互不等待）；whitelist 只讀一次 schedules.json。
+    回傳 {clinic_id: sessions 或 fetch.SourceError}，順序同 clinic_ids。
+    """
+    whitelists = {c["id"]: c.get("whitelist", []) for c in load_clinics(SCHEDULES_JSON)}
+    results = await asyncio.gather(*(scrape_clinic(c, start_date, weeks, whitelists.get(c, []))
+                                     for c in clinic_ids), return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException) and not isinstance(r, fetch.SourceError):
+            raise r
+    return dict(zip(clinic_ids, results))
 
 
 def main():
     parser = argparse.ArgumentParser(description="Vision.com.tw 班表爬蟲")
-    parser.add_argument("--clinic", required=True, help="診所 ID，例如 c24")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--clinic", nargs="+", help="診所 ID，例如 c24（可多個，同時爬取）")
+    target.add_argument("--all", action="store_true", help="VISION_CLINICS 全部同時爬取")
     parser.add_argument("--weeks", type=int, default=5, help="爬取週數（預設 5）")
     parser.add_argument("--start-date", help="起始日期 YYYY-MM-DD（預設今天）")
     parser.add_argument("--output", help="輸出 JSON 檔案路徑")
+    fetch.add_capture_arguments(parser)
     args = parser.parse_args()
+    if args.weeks < 1:
+        parser.error("--weeks 至少為 1")
+    fetch.configure(args)
 
     start_date = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else datetime.now()
+    clinic_ids = list(VISION_CLINICS) if args.all else args.clinic
+    unknown = [c for c in clinic_ids if c not in VISION_CLINICS]
+    if unknown:
+        raise SystemExit(f"未知診所 ID: {', '.join(unknown)}")
 
-    print(f"\n🕷️  Vision.com.tw 爬蟲 - {args.clinic}")
+    print(f"\n🕷️  Vision.com.tw 爬蟲 - {', '.join(clinic_ids)}")
     print(f"   起始日: {start_date.strftime('%Y-%m-%d')}, 爬取 {args.weeks} 週\n")
 
-    sessions = scrape_clinic(args.clinic, start_date, args.weeks)
+    results = fetch.run(scrape_clinics(clinic_ids, start_date, args.weeks))
+    errors = [e for e in results.values() if isinstance(e, fetch.SourceError)]
+    if errors:
+        raise SystemExit("\n" + "\n".join(f"❌ {e}" for e in errors) + "\n（未輸出任何 sessions）")
+    sessions = [s for ss in results.values() for s in ss]
 
-    print(f"\n✅ 共 {len(sessions)} 筆 sessions")
+    print(f"\n✅ 共 {len(sessions)} 筆 sessions（{fetch.client().stats_line()}）")
     for s in sessions:
         print(f"  {s['id']:20} {s['date']} {s['slot']:10} {s['doctor_name']}")
 
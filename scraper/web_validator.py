@@ -4,7 +4,7 @@
 功能：
 1. 反爬蟲偵測（robots.txt、Cloudflare、JS 渲染需求）
 2. 爬取時同步建立快照（HTML + 截圖 + 提取結果）
-3. 快照存於 snapshots/web/{clinic_id}/
+3. 快照 meta 存於 snapshots/web/{clinic_id}/，HTML 依內容雜湊存在 snapshots/objects/（snapshot_store）
 
 用法：
   # 只做反爬蟲偵測
@@ -18,15 +18,27 @@
 
   # 對指定 URL 做快照（不需要 clinic_id）
   python3 web_validator.py --url http://web.cxms.com.tw/wn/hosp.php --clinic c02
+
+--check-only 同時偵測所有診所（最多 CHECK_WORKERS 個同時進行，同一 host 的同時請求數
+仍由 fetch.Client 限制）；robots.txt 每個 host 只抓一次，快取 ROBOTS_TTL 秒。
+所有請求都可 --record DIR 錄下、--replay DIR 離線重播（見 fetch.py）。
+快照經 httpcache 條件式請求抓取：頁面與上次快照時相同就不再存新快照，結尾列出未變動的診所；
+快取不在時（例如錄製 / 重播）仍以 sha256 與上一份 meta 比對，相同內容只多一個 meta。
 """
 
 import argparse
+import asyncio
 import json
 import time
-import urllib.request
 import urllib.robotparser
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
+
+import fetch
+import snapshot_store
+from httpcache import HTTPCache
+from store import load_clinics
 
 SCRAPER_DIR = Path(__file__).parent
 SNAPSHOT_DIR = SCRAPER_DIR / "snapshots" / "web"
@@ -35,12 +47,20 @@ SCHEDULES_JSON = SCRAPER_DIR.parent / "schedules.json"
 # CXMS 診所清單（從 schedules.json 讀取）
 CXMS_CLINICS = {}
 
+# 快照用的條件式請求快取（scraper/cache/http/）
+HTTP_CACHE = HTTPCache()
+
+# robots.txt 快取：origin → (到期時間 monotonic, 抓取 task)；同 host 的診所共用一次抓取
+ROBOTS_TTL = 3600
+_robots_cache = {}
+
+# --check-only 同時偵測的診所數上限
+CHECK_WORKERS = 8
+
 def load_cxms_clinics():
     """從 schedules.json 讀取 CXMS 診所"""
     global CXMS_CLINICS
-    with open(SCHEDULES_JSON, encoding="utf-8") as f:
-        data = json.load(f)
-    for c in data["clinics"]:
+    for c in load_clinics(SCHEDULES_JSON):
         url = c.get("source_url", "")
         if "cxms.com.tw" in url:
             CXMS_CLINICS[c["id"]] = {
@@ -50,19 +70,45 @@ def load_cxms_clinics():
     return CXMS_CLINICS
 
 
-def check_robots_txt(base_url: str) -> dict:
+async def _fetch_robots(robots_url: str) -> urllib.robotparser.RobotFileParser:
+    rp = urllib.robotparser.RobotFileParser(robots_url)
+    try:
+        resp = await fetch.client().get(robots_url)
+        rp.parse(resp.text().splitlines())
+    except fetch.HTTPError as e:
+        # 與 RobotFileParser.read() 相同：401/403 視為全部禁止，其他 4xx 視為全部允許
+        if e.status in (401, 403):
+            rp.disallow_all = True
+        elif 400 <= e.status < 500:
+            rp.allow_all = True
+        else:
+            raise
+    return rp
+
+
+async def robots_parser(robots_url: str) -> urllib.robotparser.RobotFileParser:
+    """
+    同一個 robots.txt 在 ROBOTS_TTL 內只抓一次。快取的是 task：
+    多個診所同時查同一 host 時，後到的直接等第一個抓取完成（抓取失敗也一併快取到期為止）。
+    """
+    now = time.monotonic()
+    hit = _robots_cache.get(robots_url)
+    if hit is None or hit[0] <= now:
+        hit = (now + ROBOTS_TTL, asyncio.ensure_future(_fetch_robots(robots_url)))
+        _robots_cache[robots_url] = hit
+    return await hit[1]
+
+
+async def check_robots_txt(base_url: str) -> dict:
     """檢查 robots.txt 是否允許爬取"""
     result = {"allowed": True, "robots_url": "", "error": None}
     try:
         # 取得 base URL
-        from urllib.parse import urlparse
         parsed = urlparse(base_url)
         robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
         result["robots_url"] = robots_url
 
-        rp = urllib.robotparser.RobotFileParser()
-        rp.set_url(robots_url)
-        rp.read()
+        rp = await robots_parser(robots_url)
         result["allowed"] = rp.can_fetch("*", base_url)
     except Exception as e:
         result["error"] = str(e)
@@ -70,7 +116,7 @@ def check_robots_txt(base_url: str) -> dict:
     return result
 
 
-def check_anti_scraping(url: str, clinic_name: str = "") -> dict:
+async def check_anti_scraping(url: str, clinic_name: str = "") -> dict:
     """
     偵測反爬蟲機制
     回傳：
@@ -95,60 +141,50 @@ def check_anti_scraping(url: str, clinic_name: str = "") -> dict:
     }
 
     # 1. 檢查 robots.txt
-    robots = check_robots_txt(url)
+    robots = await check_robots_txt(url)
     result["robots_ok"] = robots["allowed"]
     if not robots["allowed"]:
         print(f"  ⚠️  robots.txt 不允許爬取: {url}")
 
     # 2. 發送 HTTP 請求
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/121.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            result["status_code"] = resp.status
-            content = resp.read()
-            result["response_size"] = len(content)
-            html = content.decode("utf-8", errors="replace")
-
-            # 偵測 Cloudflare
-            if any(kw in html for kw in ["cloudflare", "cf-ray", "__cf_bm", "Checking your browser"]):
-                result["has_cloudflare"] = True
-
-            # 偵測是否需要 JS（頁面內容極少）
-            if len(html) < 500:
-                result["needs_js"] = True
-            elif "<table" not in html.lower() and "<div" not in html.lower():
-                result["needs_js"] = True
-
-            result["accessible"] = True
-            result["_html_preview"] = html[:300]  # 前 300 字元供除錯
-
-    except urllib.error.HTTPError as e:
-        result["status_code"] = e.code
-        result["error"] = f"HTTP {e.code}: {e.reason}"
+        resp = await fetch.client().get(url, headers={"Accept": fetch.HTML_ACCEPT})
+        result["status_code"] = resp.status
+        result["response_size"] = len(resp.body)
+        html = resp.text("utf-8")
+
+        # 偵測 Cloudflare
+        if any(kw in html for kw in ["cloudflare", "cf-ray", "__cf_bm", "Checking your browser"]):
+            result["has_cloudflare"] = True
+
+        # 偵測是否需要 JS（頁面內容極少）
+        if len(html) < 500:
+            result["needs_js"] = True
+        elif "<table" not in html.lower() and "<div" not in html.lower():
+            result["needs_js"] = True
+
+        result["accessible"] = True
+        result["_html_preview"] = html[:300]  # 前 300 字元供除錯
+
+    except fetch.HTTPError as e:
+        result["status_code"] = e.status
+        result["error"] = f"HTTP {e.status}: {e.reason}"
     except Exception as e:
         result["error"] = str(e)
 
     return result
 
 
-def scrape_with_snapshot(url: str, clinic_id: str, clinic_name: str = "") -> dict:
+async def scrape_with_snapshot(url: str, clinic_id: str, clinic_name: str = "") -> dict:
     """
     爬取網頁並建立快照
     快照內容：
-      - {date}_html.html     完整 HTML
-      - {date}_meta.json     爬取 metadata（URL、時間、狀態）
+      - {date}_meta.json     爬取 metadata（URL、時間、狀態、sha256）
+      - 完整 HTML 存在 snapshots/objects/，與上一份相同時不另存
     注意：截圖需要 Selenium，此函數先做 HTML 快照
     """
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
     clinic_dir = SNAPSHOT_DIR / clinic_id
-    clinic_dir.mkdir(parents=True, exist_ok=True)
 
     result = {
         "clinic_id": clinic_id,
@@ -159,44 +195,37 @@ def scrape_with_snapshot(url: str, clinic_id: str, clinic_name: str = "") -> dic
         "html_file": None,
         "meta_file": None,
         "success": False,
+        "unchanged": False,
         "error": None,
     }
 
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/121.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            content = resp.read()
-            html = content.decode("utf-8", errors="replace")
-
-        # 儲存 HTML 快照
-        html_file = clinic_dir / f"{date_str}_html.html"
-        html_file.write_text(html, encoding="utf-8")
-        result["html_file"] = str(html_file)
-
-        # 儲存 metadata
-        meta = {
+        resp = await HTTP_CACHE.get(url, headers={"Accept": fetch.HTML_ACCEPT})
+        if HTTP_CACHE.processed(resp):
+            result["unchanged"] = result["success"] = True
+            print(f"  ⏭️  {clinic_name}: 與上次快照相同，略過")
+            return result
+        content = resp.body
+
+        meta = snapshot_store.save(clinic_dir, date_str, {
             "clinic_id": clinic_id,
             "clinic_name": clinic_name,
             "url": url,
             "scraped_at": datetime.now().isoformat(),
-            "html_file": str(html_file),
             "html_size_bytes": len(content),
             "status": "success",
-        }
-        meta_file = clinic_dir / f"{date_str}_meta.json"
-        meta_file.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-        result["meta_file"] = str(meta_file)
+        }, content, ".html")
+        result["html_file"] = meta["html_file"]
+        result["meta_file"] = meta["meta_file"]
+        result["unchanged"] = not meta["changed"]
         result["success"] = True
+        HTTP_CACHE.mark_processed(resp)
 
-        print(f"  ✅ {clinic_name}: HTML 快照已儲存 ({len(content):,} bytes)")
-        print(f"     → {html_file}")
+        if meta["changed"]:
+            print(f"  ✅ {clinic_name}: HTML 快照已儲存 ({len(content):,} bytes)")
+            print(f"     → {meta['html_file']}")
+        else:
+            print(f"  ⏭️  {clinic_name}: 內容與上一份快照相同（sha256 {meta['sha256'][:12]}），只記 meta")
 
     except Exception as e:
         result["error"] = str(e)
@@ -205,19 +234,23 @@ def scrape_with_snapshot(url: str, clinic_id: str, clinic_name: str = "") -> dic
     return result
 
 
-def run_check_only():
-    """只做反爬蟲偵測，不儲存快照"""
+async def run_check_only(workers: int = CHECK_WORKERS):
+    """只做反爬蟲偵測，不儲存快照（最多 workers 個診所同時偵測，結果依診所順序列出）"""
     clinics = load_cxms_clinics()
-    print(f"\n🔍 反爬蟲偵測 - {len(clinics)} 個 CXMS 診所\n")
-    print(f"{'診所':12} {'狀態碼':8} {'CF':5} {'需JS':6} {'robots':7} {'大小':10} {'說明'}")
-    print("-" * 70)
+    print(f"\n🔍 反爬蟲偵測 - {len(clinics)} 個 CXMS 診所（同時 {workers} 個）\n")
+    t0 = time.perf_counter()
+    pool = asyncio.Semaphore(workers)
+
+    async def check(info):
+        async with pool:
+            print(f"  檢查 {info['name']} ({info['url']})...")
+            return await check_anti_scraping(info["url"], info["name"])
 
-    results = []
-    for clinic_id, info in clinics.items():
-        print(f"  檢查 {info['name']} ({info['url']})...")
-        r = check_anti_scraping(info["url"], info["name"])
-        results.append(r)
+    results = await asyncio.gather(*(check(info) for info in clinics.values()))
 
+    print(f"\n{'診所':12} {'狀態碼':8} {'CF':5} {'需JS':6} {'robots':7} {'大小':10} {'說明'}")
+    print("-" * 70)
+    for info, r in zip(clinics.values(), results):
         status = r.get("status_code", "ERR")
         cf = "⚠️" if r["has_cloudflare"] else "✅"
         js = "⚠️" if r["needs_js"] else "✅"
@@ -226,7 +259,7 @@ def run_check_only():
         note = r.get("error", "OK") or "OK"
 
         print(f"  {info['name']:10} {str(status):8} {cf:5} {js:6} {robots:7} {size:10} {note[:30]}")
-        time.sleep(1)  # 避免過快請求
+    print(f"\n⏱️  {time.perf_counter() - t0:.1f}s（{fetch.client().stats_line()}）")
 
     # 儲存偵測結果
     report_file = SCRAPER_DIR / f"anti_scraping_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -243,15 +276,15 @@ def run_check_only():
     return results
 
 
-def run_snapshot(clinic_id: str = None, url: str = None):
+async def run_snapshot(clinic_id: str = None, url: str = None):
     """對指定診所或 URL 做快照"""
     clinics = load_cxms_clinics()
 
     if clinic_id and clinic_id in clinics:
         info = clinics[clinic_id]
-        result = scrape_with_snapshot(info["url"], clinic_id, info["name"])
+        result = await scrape_with_snapshot(info["url"], clinic_id, info["name"])
     elif url and clinic_id:
-        result = scrape_with_snapshot(url, clinic_id, clinic_id)
+        result = await scrape_with_snapshot(url, clinic_id, clinic_id)
     else:
         print("❌ 請指定 --clinic 或同時指定 --url 和 --clinic")
         return
@@ -259,18 +292,17 @@ def run_snapshot(clinic_id: str = None, url: str = None):
     return result
 
 
-def run_all_cxms_snapshots():
-    """對所有 CXMS 診所做快照"""
+async def run_all_cxms_snapshots():
+    """對所有 CXMS 診所做快照（同時發出，同一 host 的同時請求數由 fetch.Client 限制）"""
     clinics = load_cxms_clinics()
     print(f"\n📸 開始對 {len(clinics)} 個 CXMS 診所建立快照...\n")
-    results = []
-    for clinic_id, info in clinics.items():
-        r = scrape_with_snapshot(info["url"], clinic_id, info["name"])
-        results.append(r)
-        time.sleep(2)  # 避免過快請求
+    results = await asyncio.gather(*(scrape_with_snapshot(info["url"], clinic_id, info["name"])
+                                     for clinic_id, info in clinics.items()))
 
     success = sum(1 for r in results if r["success"])
-    print(f"\n✨ 完成: {success}/{len(results)} 成功")
+    unchanged = [r["clinic_id"] for r in results if r["unchanged"]]
+    print(f"\n✨ 完成: {success}/{len(results)} 成功，{len(unchanged)} 個未變動"
+          + (f"（{', '.join(unchanged)}）" if unchanged else ""))
     return results
 
 
@@ -280,18 +312,22 @@ def main():
     parser.add_argument("--clinic", help="診所 ID (例如 c02)")
     parser.add_argument("--url", help="指定 URL")
     parser.add_argument("--all-cxms", action="store_true", help="對所有 CXMS 診所做快照")
+    parser.add_argument("--workers", type=int, default=CHECK_WORKERS,
+                        help=f"--check-only 同時偵測的診所數（預設 {CHECK_WORKERS}）")
+    fetch.add_capture_arguments(parser)
     args = parser.parse_args()
+    fetch.configure(args)
 
     if args.check_only:
-        run_check_only()
+        fetch.run(run_check_only(args.workers))
     elif args.all_cxms:
-        run_all_cxms_snapshots()
+        fetch.run(run_all_cxms_snapshots())
     elif args.clinic or args.url:
-        run_snapshot(clinic_id=args.clinic, url=args.url)
+        fetch.run(run_snapshot(clinic_id=args.clinic, url=args.url))
     else:
         # 預設：先做偵測
         print("未指定模式，執行反爬蟲偵測...")
-        run_check_only()
+        fetch.run(run_check_only(args.workers))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+每週日班表更新 — 一次跑完有腳本的來源，最後只寫一次 schedules.json。
+
+來源：
+  - 類型 A-hix：hixcare_scraper（HIXCARE_CLINICS 全部，預設本週 + 下週）
+  - 類型 E    ：vision_scraper（VISION_CLINICS 全部，預設 5 週）
+  - 類型 A    ：cxms_scraper（CXMS_CLINICS 全部，網頁只有一週：起始日所在週，週日視為下週）
+  - 其他人工整理好的 sessions JSON（c21 永馨等）：用 --replace 併入同一次寫回
+
+hixcare、vision、CXMS 三個來源透過 fetch.py 同時抓取（各診所也同時發出，同一 host 的
+同時請求數由 fetch.Client 限制），抓完後依固定順序（hixcare → vision → CXMS → --replace）
+收進同一個 Transaction，再一次載入、一次檢查、一次寫檔，最後印出每家診所刪舊 / 新增筆數。
+
+某家診所抓取失敗（fetch 重試後仍失敗 / 斷路中 → SourceError）或抓到 0 筆時，
+該診所不做範圍替換、保留既有 sessions，其餘診所照常寫回，最後列出略過的診所並以狀態碼 1 結束。
+
+每次執行最後都對 schedules.json 跑一次精簡編碼來回比對（同 compact.py --verify），
+不一致時印出差異位置並以狀態碼 1 結束。
+
+用法：
+  # 只抓取、列印各診所筆數（不寫回）
+  python3 scraper/weekly_run.py
+
+  # 抓取並一次寫回
+  python3 scraper/weekly_run.py --update-schedules
+
+  # 寫回後順便封存 7 天前的舊 sessions（見 retention.py）
+  python3 scraper/weekly_run.py --update-schedules --archive
+
+  # 錄下各來源回應 / 離線重播整個流程（不連網，CI 用）
+  python3 scraper/weekly_run.py --record /tmp/rec/weekly
+  python3 scraper/weekly_run.py --replay /tmp/rec/weekly --start-date 2026-06-29
+
+  # 併入人工整理的 sessions（例：永馨）
+  python3 scraper/weekly_run.py --update-schedules --replace c21 /tmp/c21.json
+"""
+
+import argparse
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import compact
+import cxms_scraper
+import fetch
+import hixcare_scraper
+import retention
+import vision_scraper
+from store import (SCHEDULES_JSON, ScheduleStore, Transaction, parse_replace, print_conflicts, print_overlaps,
+                   print_report)
+
+
+def usable(source: str, clinic_id: str, result, failed: list) -> bool:
+    """
+    抓取結果能不能拿來範圍替換：失敗（SourceError）或 0 筆都不行，記進 failed。
+    其他例外是程式錯誤，照樣丟出。
+    """
+    if isinstance(result, fetch.SourceError):
+        print(f"  [{source}] {clinic_id} ⚠️  {result}，不寫回（保留既有 sessions）")
+    elif isinstance(result, BaseException):
+        raise result
+    elif not result:
+        print(f"  [{source}] {clinic_id} ⚠️  抓到 0 筆，不寫回（保留既有 sessions）")
+    else:
+        return True
+    failed.append(clinic_id)
+    return False
+
+
+async def collect_hixcare(start: datetime, weeks: int, failed: list) -> list:
+    """回傳 [(clinic_id, sessions, date_from, date_to)]，順序同 HIXCARE_CLINICS；失敗的診所記進 failed。"""
+    date_from, date_to = hixcare_scraper.week_range(start, weeks)
+    results = await hixcare_scraper.build_all(date_from, date_to)
+    ops = []
+    for clinic_id, result in results.items():
+        cfg = hixcare_scraper.HIXCARE_CLINICS[clinic_id]
+        sessions, skipped, _ = (result, 0, None) if isinstance(result, BaseException) else result
+        if not usable("hixcare", clinic_id, sessions, failed):
+            continue
+        print(f"  [hixcare] {clinic_id} {cfg['name']} {date_from} ~ {date_to}："
+              f"{len(sessions)} 筆（跳過 {skipped}）")
+        ops.append((clinic_id, sessions, date_from, date_to))
+    return ops
+
+
+async def collect_vision(start: datetime, weeks: int, failed: list) -> list:
+    """回傳 [(clinic_id, sessions, date_from, date_to)]，順序同 VISION_CLINICS；失敗的診所記進 failed。"""
+    monday = vision_scraper.get_monday(start)
+    date_from = monday.strftime("%Y-%m-%d")
+    date_to = (monday + timedelta(days=7 * weeks - 1)).strftime("%Y-%m-%d")
+    results = await vision_scraper.scrape_clinics(list(vision_scraper.VISION_CLINICS), start, weeks)
+    ops = []
+    for clinic_id, sessions in results.items():
+        cfg = vision_scraper.VISION_CLINICS[clinic_id]
+        if not usable("vision", clinic_id, sessions, failed):
+            continue
+        print(f"  [vision] {clinic_id} {cfg['name']} {date_from} ~ {date_to}：{len(sessions)} 筆")
+        ops.append((clinic_id, sessions, date_from, date_to))
+    return ops
+
+
+async def collect_cxms(start: datetime, failed: list) -> list:
+    """回傳 [(clinic_id, sessions, date_from, date_to)]，順序同 CXMS_CLINICS；失敗的診所記進 failed。"""
+    monday = cxms_scraper.week_monday(start)
+    date_from = monday.strftime("%Y-%m-%d")
+    date_to = (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+    results = await cxms_scraper.build_all(monday)
+    ops = []
+    for clinic_id, result in results.items():
+        cfg = cxms_scraper.CXMS_CLINICS[clinic_id]
+        sessions, unknown = (result, []) if isinstance(result, BaseException) else result[:2]
+        if not usable("cxms", clinic_id, sessions, failed):
+            continue
+        print(f"  [cxms] {clinic_id} {cfg['name']} {date_from} ~ {date_to}：{len(sessions)} 筆"
+              + (f"（認不得的診次：{', '.join(unknown)}）" if unknown else ""))
+        ops.append((clinic_id, sessions, date_from, date_to))
+    return ops
+
+
+async def collect_all(start: datetime, hix_weeks: int, vision_weeks: int, failed: list) -> list:
+    """三個來源同時抓；回傳的 ops 固定為 hixcare、vision、CXMS 的順序。"""
+    hix_ops, vision_ops, cxms_ops = await asyncio.gather(collect_hixcare(start, hix_weeks, failed),
+                                                         collect_vision(start, vision_weeks, failed),
+                                                         collect_cxms(start, failed))
+    return hix_ops + vision_ops + cxms_ops
+
+
+def verify_compact() -> bool:
+    """schedules.json 的精簡編碼來回比對（compact.py --verify）；不一致時印出原因並回 False。"""
+    with open(SCHEDULES_JSON, encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        compact.verify_round_trip(data)
+    except ValueError as e:
+        print(f"\n❌ {compact.COMPACT_JSON.name}：{e}")
+        return False
+    print(f"\n✅ 精簡編碼來回比對一致（{len(data['sessions'])} 筆 sessions）")
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="每週日班表更新（一次寫回）")
+    ap.add_argument("--start-date", help="起始日 YYYY-MM-DD（預設今天）")
+    ap.add_argument("--hix-weeks", type=int, default=2, help="hixcare 週數（預設 2=本週+下週）")
+    ap.add_argument("--vision-weeks", type=int, default=5, help="vision 週數（預設 5）")
+    ap.add_argument("--replace", nargs="+", action="append", default=[],
+                    metavar="CLINIC SESSIONS_JSON [DATE_FROM DATE_TO]",
+                    help="併入人工整理的 sessions JSON；可重複")
+    ap.add_argument("--update-schedules", action="store_true", help="一次寫回 schedules.json")
+    ap.add_argument("--reject-conflicts", action="store_true", help="新增的 sessions 有衝突時整批不寫回")
+    ap.add_argument("--db", action="store_true",
+                    help="改寫進 schedules.db（之後 db.py --export 寫回 schedules.json）")
+    ap.add_argument("--archive", action="store_true",
+                    help=f"寫回後封存 {retention.DEFAULT_KEEP_DAYS} 天前的 sessions 到 archive/")
+    fetch.add_capture_arguments(ap)
+    args = ap.parse_args()
+    fetch.configure(args)
+
+    start = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else datetime.now()
+    print(f"🗓️  每週更新　起始日：{start.strftime('%Y-%m-%d')}\n")
+
+    txn = Transaction(reject_conflicts=args.reject_conflicts)
+    failed = []
+    for clinic_id, sessions, date_from, date_to in fetch.run(
+            collect_all(start, args.hix_weeks, args.vision_weeks, failed)):
+        txn.replace(clinic_id, sessions, date_from, date_to)
+    print(f"  {fetch.client().stats_line()}")
+    for values in args.replace:
+        clinic_id, sessions, date_from, date_to = parse_replace(values)
+        print(f"  [file] {clinic_id} {date_from} ~ {date_to}：{len(sessions)} 筆")
+        txn.replace(clinic_id, sessions, date_from, date_to)
+
+    if failed:
+        print(f"\n⚠️  略過 {len(failed)} 家診所（抓取失敗或 0 筆，既有 sessions 不動）：{', '.join(failed)}")
+
+    if not args.update_schedules:
+        print(f"\n共 {len(txn)} 筆範圍替換（未寫回，加上 --update-schedules 寫回）")
+        compact_ok = verify_compact()
+        raise SystemExit(1 if failed or not compact_ok else 0)
+    if not len(txn):
+        # 全部來源都失敗：不寫檔（連 generated_at 都不動）
+        raise SystemExit("\n❌ 沒有可寫回的範圍替換，schedules.json 未變動")
+
+    if args.db:
+        report = txn.commit_db()
+        print(f"\n✅ 已寫入 schedules.db（總 sessions {txn.total}）")
+    else:
+        report = txn.commit()
+        print(f"\n✅ 已寫回 schedules.json（總 sessions {txn.total}）")
+    print_report(report)
+    if txn.conflicts:
+        print()
+        print_conflicts(txn.store or ScheduleStore.load(), txn.conflicts)
+    if txn.overlaps:
+        print()
+        print_overlaps(txn.store, txn.overlaps)
+
+    if args.archive:
+        moved = retention.archive()
+        print(f"\n📦 已封存 {retention.cutoff_date()} 以前的 sessions {sum(moved.values())} 筆 → archive/")
+    if not verify_compact() or failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()